@@ -0,0 +1,124 @@
+# admission.py
+# Donor request queue in front of the donation cycle
+#
+# How it works:
+# - Every button press is handed to AdmissionQueue.press() straight from the
+#   GPIO edge callback, with its edge timestamp - even while a cycle is
+#   running, so nobody's press gets dropped.
+# - Presses closer than coalesce_window to the latest press of the previous
+#   request are the same donor pressing again: they are merged into that
+#   request (and slide its window on) - but only while it is still queued or
+#   running, so a donor hammering the button during their own cycle doesn't
+#   queue extra cycles. Once its cycle has finished,
+#   a new press is a new request (e.g. "No object detected", try again).
+# - The main loop takes requests in order with next() and starts the next
+#   cycle as soon as the previous one has finished (box locked again).
+# - stats() reports queue depth, press counts and wait times (press -> cycle
+#   start); main.py exports them at /metrics so bursts can be watched.
+
+import threading
+
+COALESCE_WINDOW = 2.0   # seconds; presses this close together = one donor
+MAX_DEPTH = 10          # requests waiting beyond this are dropped (and counted)
+
+
+class DonorRequest:
+    """One admitted donor: when they first pressed and how often."""
+
+    def __init__(self, pressed_at):
+        self.pressed_at = pressed_at
+        self.last_press = pressed_at     # latest merged press (slides the coalesce window)
+        self.presses = 1
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def wait(self):
+        """Seconds between the press and the start of its cycle."""
+        return None if self.started_at is None else self.started_at - self.pressed_at
+
+
+class AdmissionQueue:
+    """FIFO of DonorRequests with duplicate coalescing and wait statistics."""
+
+    def __init__(self, clock, coalesce_window=COALESCE_WINDOW, max_depth=MAX_DEPTH):
+        self.clock = clock
+        self.coalesce_window = coalesce_window
+        self.max_depth = max_depth
+        self._queue = []
+        self._last_admitted = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self.admitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.max_depth_seen = 0
+
+    def press(self, timestamp=None):
+        """Record a button press. Returns True if it became a new request."""
+        ts = self.clock.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            last = self._last_admitted
+            if (last is not None and last.finished_at is None
+                    and ts - last.last_press < self.coalesce_window):
+                last.presses += 1
+                last.last_press = max(last.last_press, ts)
+                self.coalesced += 1
+                return False
+            if len(self._queue) >= self.max_depth:
+                self.dropped += 1
+                return False
+
+            request = DonorRequest(ts)
+            self._queue.append(request)
+            self._last_admitted = request
+            self.admitted += 1
+            self.max_depth_seen = max(self.max_depth_seen, len(self._queue))
+        self._ready.set()
+        return True
+
+    def next(self, timeout=None):
+        """Block until a request is waiting; mark it started and return it (None on timeout)."""
+        while True:
+            self._ready.clear()
+            with self._lock:
+                if self._queue:
+                    request = self._queue.pop(0)
+                    request.started_at = self.clock.monotonic()
+                    wait = request.wait
+                    self.last_wait = wait
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    return request
+            if not self.clock.wait(self._ready, timeout) and timeout is not None:
+                return None
+
+    def finished(self, request):
+        with self._lock:
+            request.finished_at = self.clock.monotonic()
+            self.served += 1
+
+    @property
+    def depth(self):
+        """Requests still waiting (not counting the one being served)."""
+        return len(self._queue)
+
+    def stats(self):
+        with self._lock:
+            started = self.admitted - len(self._queue)
+            return {
+                "depth": len(self._queue),
+                "max_depth": self.max_depth_seen,
+                "admitted": self.admitted,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "served": self.served,
+                "last_wait": self.last_wait,
+                "max_wait": self.max_wait,
+                "mean_wait": self.total_wait / started if started else 0.0,
+            }
@@ -0,0 +1,87 @@
+# assets.py
+# Static files for the status page: fingerprinted, precompressed, cached forever
+#
+# How it works:
+# - At startup AssetPipeline.add("style.css") reads the file once, names it
+#   after a hash of its content (style.3f9c2a1b7d.css) and keeps gzip (and
+#   brotli, if the `brotli` package is installed) versions next to the raw
+#   bytes. Nothing is read or compressed per request.
+# - The page links url("style.css"). Because the name changes whenever the
+#   content does, browsers may cache the file forever ("immutable"): a kiosk
+#   that reloads after a network blip doesn't even ask for it again.
+# - choose_encoding() picks the smallest stored encoding the browser accepts.
+# - Files that don't exist (e.g. no mascot image copied to static/ yet) keep
+#   their plain /static/... URL.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:     # optional: gzip only
+    brotli = None
+
+URL_PREFIX = "/assets/"
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+COMPRESS_TYPES = ("text/", "application/javascript", "image/svg+xml")
+
+
+class Asset:
+    """One static file, with its bytes per content-encoding."""
+
+    def __init__(self, name, data, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        stem, ext = os.path.splitext(name)
+        self.fingerprinted = f"{stem}.{digest}{ext}"
+        self.etag = f'"{digest}"'
+        self.encodings = {"identity": data}
+        if mimetype.startswith(COMPRESS_TYPES):
+            self.encodings["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(data)
+
+
+class AssetPipeline:
+    """Fingerprinted static assets served from memory."""
+
+    def __init__(self, directory, url_prefix=URL_PREFIX):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._by_name = {}
+        self._by_url = {}
+
+    def add(self, name):
+        """Load + fingerprint + compress one file from the directory (if it exists)."""
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(name, data, mimetype)
+        self._by_name[name] = asset
+        self._by_url[asset.fingerprinted] = asset
+        return asset
+
+    def url(self, name):
+        asset = self._by_name.get(name)
+        if asset is None:
+            return "/static/" + name
+        return self.url_prefix + asset.fingerprinted
+
+    def lookup(self, fingerprinted):
+        return self._by_url.get(fingerprinted)
+
+    @staticmethod
+    def choose_encoding(asset, accept_encodings):
+        """Smallest stored encoding the client accepts (`accept_encodings`: name -> quality)."""
+        best = "identity"
+        for encoding, data in asset.encodings.items():
+            if encoding != "identity" and accept_encodings(encoding) > 0:
+                if len(data) < len(asset.encodings[best]):
+                    best = encoding
+        return best
@@ -0,0 +1,240 @@
+# benchmark.py
+# Benchmarks for the control and web hot paths (runs on any Linux box, no Pi)
+#
+# How it works:
+# - Uses the simulated hardware backend (hardware.py "sim"), so GPIO, LEDs
+#   and all fixed delays run on the virtual clock. Real (wall) time measured
+#   here is therefore pure Python overhead: sleeps / step delays cost nothing.
+# - Door moves are timed on the stepper engine's real hot loop
+#   (StepperEngine._execute: one batched GPIO.output per frame), not the
+#   simulator's clock callbacks. It runs with a no-op stand-in GPIO and a
+#   clock whose sleep() returns at once, so the result is the Python cost
+#   per frame - what bounds how small STEP_DELAY can get.
+# - Each benchmark runs a function many times and records per-call timings
+#   (mean / p50 / p95 / min) or throughput.
+# - Results go to a JSON file; --compare OLD.json prints the change per
+#   benchmark against an earlier run.
+#
+# Examples:
+#   python3 benchmark.py                          # -> benchmark_results.json
+#   python3 benchmark.py --quick --out new.json --compare benchmark_results.json
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+from simulate import setup_sim
+
+
+def summarize(samples, unit=1e6):
+    """Per-call timings (seconds) -> stats in microseconds."""
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "mean_us": statistics.fmean(ordered) * unit,
+        "p50_us": ordered[len(ordered) // 2] * unit,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * unit,
+        "min_us": ordered[0] * unit,
+    }
+
+
+def time_calls(fn, calls):
+    samples = []
+    perf = time.perf_counter
+    for _ in range(calls):
+        start = perf()
+        fn()
+        samples.append(perf() - start)
+    return summarize(samples)
+
+
+# ---------- individual benchmarks ----------
+def bench_log_and_print(webserver, count):
+    """Producer cost of log_and_print + end-to-end pipeline throughput."""
+    pipeline = webserver.LOG_PIPELINE
+    webserver.flush_logs()
+    consumed, dropped = pipeline.consumed, pipeline.dropped
+    # bursts of half the pipeline's capacity, so nothing is dropped
+    burst = max(1, pipeline.capacity // 2)
+    submitted = 0.0
+    start = time.perf_counter()
+    for first in range(0, count, burst):
+        t = time.perf_counter()
+        for i in range(first, min(count, first + burst)):
+            webserver.log_and_print(f"benchmark line {i}")
+        submitted += time.perf_counter() - t
+        webserver.flush_logs(timeout=30.0)
+    total = time.perf_counter() - start
+    consumed = pipeline.consumed - consumed
+    return {
+        "messages": count,
+        "submit_us_per_call": submitted / count * 1e6,
+        "submit_per_s": count / submitted,
+        "end_to_end_per_s": consumed / total,      # lines actually printed + stored
+        "dropped": pipeline.dropped - dropped,
+    }
+
+
+def bench_log_message(webserver, events, count):
+    """log_message on the consumer side: log store + status update."""
+    start = time.perf_counter()
+    for i in range(count):
+        event = events[i % len(events)]
+        webserver.log_message("benchmark line", None, event, {"total": 1})
+    elapsed = time.perf_counter() - start
+    return {"messages": count, "us_per_call": elapsed / count * 1e6, "per_s": count / elapsed}
+
+
+def bench_map_to_user_message(webserver, events, count):
+    mapper = webserver._map_to_user_message
+    start = time.perf_counter()
+    for i in range(count):
+        mapper(events[i % len(events)])
+    elapsed = time.perf_counter() - start
+    return {"calls": count, "ns_per_call": elapsed / count * 1e9}
+
+
+class _NullGPIO:
+    """Stand-in GPIO for the motor benchmark: output() does nothing."""
+
+    def output(self, channel, value):
+        pass
+
+
+class _NoSleepClock:
+    """Real monotonic time, but sleep() returns at once (step delays cost nothing)."""
+
+    virtual = False
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+
+    def sleep(self, seconds):
+        pass
+
+
+def bench_motor_moves(main, repeats):
+    """Python cost per frame of the stepper engine's hot loop for the door moves."""
+    from stepper import StepperEngine
+
+    engine = StepperEngine(_NullGPIO(), _NoSleepClock(), main.sequence)
+    results = {}
+    for name, plans in (("forward", main.forward_plans()), ("backward", main.backward_plans())):
+        program = engine.compile(plans)
+        frames = len(program.frames)
+        result = time_calls(lambda p=program: engine._execute(p), repeats)
+        result["frames"] = frames
+        result["us_per_frame"] = result["mean_us"] / frames if frames else 0.0
+        result["move_s"] = program.duration     # real duration at STEP_DELAY
+        results[name] = result
+    return results
+
+
+def bench_cycle(main, hw, repeats):
+    """Full handle_button_press: real time with the fixed delays factored out."""
+    samples = []
+    virtual = []
+    for _ in range(repeats):
+        v_start = hw.clock.monotonic()
+        start = time.perf_counter()
+        main.handle_button_press()
+        samples.append(time.perf_counter() - start)
+        virtual.append(hw.clock.monotonic() - v_start)
+        hw.clock.advance(1.0)            # donors arrive a second apart
+    result = summarize(samples)
+    result["virtual_s_per_cycle"] = statistics.fmean(virtual)
+    return result
+
+
+def bench_http(webserver, calls):
+    client = webserver.app.test_client()
+    results = {}
+    for path in ("/status_json", "/"):
+        results[path] = time_calls(lambda p=path: client.get(p), calls)
+        etag = client.get(path).headers.get("ETag")
+        if etag:
+            results[path + " (304)"] = time_calls(
+                lambda p=path: client.get(p, headers={"If-None-Match": etag}), calls
+            )
+    return results
+
+
+# ---------- runner ----------
+def run(args):
+    scale = 0.1 if args.quick else 1.0
+    n = lambda count: max(10, int(count * scale))
+
+    # Terminal output of the box itself is not what we measure
+    with contextlib.redirect_stdout(io.StringIO()):
+        hw, main = setup_sim(12.0)
+        import webserver2
+        from status_events import StatusEvent
+        events = list(StatusEvent)
+
+        results = {
+            "log_and_print": bench_log_and_print(webserver2, n(20000)),
+            "log_message": bench_log_message(webserver2, events, n(20000)),
+            "map_to_user_message": bench_map_to_user_message(webserver2, events, n(200000)),
+            "motor_moves": bench_motor_moves(main, n(50)),
+            "donation_cycle": bench_cycle(main, hw, n(50)),
+            "http": bench_http(webserver2, n(2000)),
+        }
+        main.flush_logs()
+
+    report = {
+        "meta": {
+            "when": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for line in _flatten(results):
+        print(line)
+    print(f"\nresults written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        print(f"\nchange vs {args.compare} (negative = faster / smaller):")
+        old_values = dict(_flat_values(old))
+        for key, value in _flat_values(results):
+            before = old_values.get(key)
+            if before and key.rsplit(".", 1)[-1] not in ("calls", "messages", "frames"):
+                print(f"  {key:<50} {before:>12.3f} -> {value:>12.3f}  ({(value - before) / before:+.1%})")
+
+
+def _flat_values(tree, prefix=""):
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flat_values(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, float(value)
+
+
+def _flatten(tree):
+    for key, value in _flat_values(tree):
+        yield f"{key:<50} {value:>14.3f}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Control / web hot path benchmarks (sim backend)")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--quick", action="store_true", help="10x fewer iterations")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print the change against an earlier run")
+    return parser
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args(sys.argv[1:]))
@@ -0,0 +1,181 @@
+# cycle.py
+# Donation cycle as a dependency graph of stages
+#
+# How it works:
+# - A cycle is a list of Stage objects. Each stage says which stages must be
+#   finished before it may start (after=...) and which resources it needs
+#   exclusively (resources=..., e.g. "doors"). Those two together are the
+#   safety constraints: e.g. doors only move after the lock settled, the lock
+#   only re-engages after the doors are closed.
+# - CycleScheduler starts every stage as soon as its constraints allow, so
+#   independent stages overlap (LEDs/servo during the solenoid release, belt
+#   tail during relocking, ...).
+# - A stage's start() returns one of:
+#     None           -> done immediately
+#     a number       -> done that many seconds after it started (a timer)
+#     a handle with add_done_callback(fn) -> done when the handle says so
+#   The scheduler runs on the calling thread and sleeps until the next timer
+#   or handle completes (no polling).
+# - A stage that fails stops the cycle: if start() raises, or a handle
+#   finishes with its `error` set (e.g. a door move whose GPIO write failed),
+#   no further stages start and run() raises that error, so the caller can
+#   put the box in a safe state instead of carrying on with the doors in an
+#   unknown position.
+# - run() returns a CycleReport with per-stage start/end times and the
+#   critical path: the chain of stages that actually decided the cycle time.
+
+import collections
+import threading
+
+
+class Stage:
+    """One step of the cycle."""
+
+    def __init__(self, name, start, after=(), resources=(), on_done=None):
+        self.name = name
+        self.start = start
+        self.after = tuple(after)
+        self.resources = tuple(resources)
+        self.on_done = on_done
+
+
+StageTiming = collections.namedtuple("StageTiming", "name start end blocked_by")
+
+
+class CycleReport:
+    """Timings of one run() plus its critical path."""
+
+    def __init__(self, timings, started_at):
+        self.timings = timings           # name -> StageTiming (times relative to cycle start)
+        self.started_at = started_at
+        self.total = max((t.end for t in timings.values()), default=0.0)
+
+    def critical_path(self):
+        """Stages (oldest first) whose finish gated the next one, ending at the last stage."""
+        if not self.timings:
+            return []
+        path = []
+        current = max(self.timings.values(), key=lambda t: t.end)
+        while current is not None:
+            path.append(current)
+            current = self.timings.get(current.blocked_by) if current.blocked_by else None
+        path.reverse()
+        return path
+
+    def describe(self):
+        """One-line summary for the log."""
+        steps = " -> ".join(f"{t.name} {t.end - t.start:.2f}s" for t in self.critical_path())
+        return f"{self.total:.2f} s total; critical path: {steps}"
+
+
+def validate(stages):
+    """Raise ValueError for unknown dependencies or dependency loops."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate stage names in cycle")
+    known = set(names)
+    for stage in stages:
+        missing = [d for d in stage.after if d not in known]
+        if missing:
+            raise ValueError(f"stage {stage.name!r} depends on unknown {missing}")
+
+    deps = {s.name: set(s.after) for s in stages}
+    done = set()
+    while deps:
+        ready = [n for n, d in deps.items() if d <= done]
+        if not ready:
+            raise ValueError(f"dependency loop between stages {sorted(deps)}")
+        for n in ready:
+            done.add(n)
+            del deps[n]
+
+
+class CycleScheduler:
+    """Runs a validated list of stages with as much overlap as the constraints allow."""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def run(self, stages):
+        clock = self.clock
+        started_at = clock.monotonic()
+        pending = list(stages)
+        running = {}                     # name -> deadline (timers) or None (handles)
+        finished = {}                    # name -> end (relative)
+        starts = {}                      # name -> (start, blocked_by)
+        busy = {}                        # resource -> stage name holding it
+        released_by = {}                 # resource -> last stage that held it
+        completed = collections.deque()  # (name, error) finished by handle callbacks
+        wake = threading.Event()
+        by_name = {s.name: s for s in stages}
+
+        def handle_done(name, handle):
+            completed.append((name, getattr(handle, "error", None)))
+            wake.set()
+
+        def finish(name):
+            stage = by_name[name]
+            running.pop(name, None)
+            finished[name] = clock.monotonic() - started_at
+            for res in stage.resources:
+                busy.pop(res, None)
+                released_by[res] = name
+            if stage.on_done is not None:
+                stage.on_done()
+
+        while pending or running:
+            # start everything that is allowed to start, re-scanning after
+            # each instant stage so its dependents can start right away too
+            progress = True
+            while progress:
+                progress = False
+                for stage in list(pending):
+                    if any(d not in finished for d in stage.after):
+                        continue
+                    if any(r in busy for r in stage.resources):
+                        continue
+                    pending.remove(stage)
+                    progress = True
+
+                    # who gated this start: latest dependency or resource holder
+                    gates = [d for d in stage.after] + [released_by[r] for r in stage.resources if r in released_by]
+                    blocked_by = max(gates, key=lambda d: finished[d], default=None)
+                    starts[stage.name] = (clock.monotonic() - started_at, blocked_by)
+                    for res in stage.resources:
+                        busy[res] = stage.name
+
+                    result = stage.start()
+                    if result is None:
+                        finish(stage.name)
+                    elif isinstance(result, (int, float)):
+                        running[stage.name] = starts[stage.name][0] + started_at + result
+                    else:
+                        running[stage.name] = None
+                        result.add_done_callback(lambda h, n=stage.name: handle_done(n, h))
+                    break
+
+            if not running:
+                if pending:
+                    raise RuntimeError(f"cycle stuck, cannot start {[s.name for s in pending]}")
+                break
+
+            # sleep until the next timer runs out or a handle calls back
+            wake.clear()
+            now = clock.monotonic()
+            timers = [t for t in running.values() if t is not None]
+            if not completed and not any(t <= now for t in timers):
+                clock.wait(wake, (min(timers) - now) if timers else None)
+            while completed:
+                name, error = completed.popleft()
+                if error is not None:
+                    raise error          # dependents never start
+                finish(name)
+            now = clock.monotonic()
+            for name in [n for n, t in running.items() if t is not None and t <= now]:
+                finish(name)
+
+        timings = {
+            name: StageTiming(name, starts[name][0], finished[name], starts[name][1])
+            for name in starts
+        }
+        return CycleReport(timings, started_at)
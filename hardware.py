@@ -0,0 +1,435 @@
+# hardware.py
+# Hardware abstraction layer for the donation box
+#
+# How it works:
+# - main.py never imports RPi.GPIO / rpi_ws281x / time directly anymore.
+# - It asks get_backend() for a backend and uses backend.GPIO, backend.clock,
+#   backend.PixelStrip, backend.Color and backend.ws instead.
+# - "pi"  backend = the real Raspberry Pi libraries + the real clock.
+# - "sim" backend = simulated GPIO/LEDs driven by a virtual clock, so a full
+#   donation cycle (5 s PIR window, 5 s belt run, ...) runs in milliseconds
+#   on any Linux box.
+#
+# Pick the backend with the DONATION_BACKEND environment variable
+# ("pi" or "sim"), or call use_backend("sim") BEFORE importing main.py.
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+SPEED_OF_SOUND_CM_S = 34300
+
+# -----------------------------
+# CLOCKS
+# -----------------------------
+class RealClock:
+    """Wall/monotonic time straight from the time module."""
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout=None):
+        """Block until threading.Event `event` is set or `timeout` expires."""
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """
+    Simulated clock. Time only moves when someone sleeps/waits (or when
+    simulated hardware charges time for an operation), and scheduled
+    callbacks fire exactly at their timestamp while time moves past them.
+
+    Code that would normally run on its own timing thread should schedule
+    its work with call_at() instead when clock.virtual is True, so the whole
+    simulation stays on one thread and stays deterministic.
+
+    Periodic background work (e.g. distance sampling) is scheduled with
+    background=True: it runs whenever time moves past it, but it never keeps
+    a wait() without timeout going on its own, so an idle simulation blocks
+    instead of racing virtual time forward.
+    """
+
+    virtual = True
+
+    def __init__(self, start=0.0, epoch=1_700_000_000.0):
+        self._now = float(start)
+        self._epoch = epoch
+        self._lock = threading.RLock()
+        self._queue = []                 # heap of (when, seq, callback, background)
+        self._seq = itertools.count()
+        self._foreground = 0             # queued callbacks with background=False
+
+    # --- time module look-alikes ---
+    def time(self):
+        return self._epoch + self._now
+
+    def monotonic(self):
+        return self._now
+
+    def perf_counter(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(max(0.0, seconds))
+
+    # --- simulation controls ---
+    def call_at(self, when, callback, background=False):
+        """Run callback() when virtual monotonic time reaches `when`."""
+        with self._lock:
+            heapq.heappush(self._queue, (when, next(self._seq), callback, background))
+            if not background:
+                self._foreground += 1
+
+    def call_later(self, delay, callback, background=False):
+        self.call_at(self._now + delay, callback, background)
+
+    def next_event_time(self):
+        with self._lock:
+            return self._queue[0][0] if self._queue else None
+
+    def advance(self, seconds):
+        """Move time forward, firing any scheduled callbacks on the way."""
+        self.advance_to(self._now + seconds)
+
+    def advance_to(self, target):
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > target:
+                    self._now = max(self._now, target)
+                    return
+                when, _, callback, background = heapq.heappop(self._queue)
+                if not background:
+                    self._foreground -= 1
+                self._now = max(self._now, when)
+            # run outside the lock so callbacks may schedule more work
+            callback()
+
+    def wait(self, event, timeout=None):
+        """
+        Virtual-time version of event.wait(): step from one scheduled
+        callback to the next until the event is set or the timeout runs out.
+        With nothing scheduled (or only background work) and no timeout, fall
+        back to a real wait so another thread can still set the event.
+        """
+        deadline = None if timeout is None else self._now + timeout
+        while not event.is_set():
+            nxt = self.next_event_time()
+            if nxt is None or (deadline is None and not self._foreground):
+                if deadline is None:
+                    return event.wait()
+                self.advance_to(deadline)
+                break
+            if deadline is not None and nxt > deadline:
+                self.advance_to(deadline)
+                break
+            self.advance_to(nxt)
+        return event.is_set()
+
+
+# -----------------------------
+# SIMULATED GPIO (RPi.GPIO look-alike)
+# -----------------------------
+class SimPWM:
+    """Stand-in for RPi.GPIO.PWM; only remembers what was commanded."""
+
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0.0
+        self.running = False
+        self.history = []                # (t, duty)
+
+    def start(self, duty_cycle):
+        self.running = True
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.history.append((self.gpio.clock.monotonic(), duty_cycle))
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+
+
+class _Ultrasonic:
+    """HC-SR04 model: a trigger pulse >= 10 µs produces an echo pulse."""
+
+    BURST_DELAY = 0.00045   # 8 x 40 kHz burst + sensor latency before echo rises
+    MIN_TRIGGER = 10e-6 - 1e-9   # 10 µs trigger pulse (minus float slack)
+
+    def __init__(self, trig, echo, distance_cm):
+        self.trig = trig
+        self.echo = echo
+        self.distance_cm = distance_cm   # None = echo never comes back
+        self.trig_high_at = None
+
+
+class SimGPIO:
+    """
+    Simulated RPi.GPIO module. Same constants and call signatures that
+    main.py uses, plus helpers for driving inputs from a script.
+    """
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    READ_COST = 2e-6        # time charged per input() read (keeps spin loops finite)
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.mode = None
+        self.pin_modes = {}
+        self.levels = {}
+        self.writes = 0                  # output() calls (a batched write counts once)
+        self.reads = 0
+        self.history = []                # (t, pin, level) for every output()
+        self.record_history = True
+        self._ultrasonics = {}           # trig pin -> _Ultrasonic
+        self._edge_detect = {}           # pin -> (edge, [callbacks])
+
+    # --- RPi.GPIO API ---
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        self.pin_modes[channel] = direction
+        if direction == self.IN:
+            self.levels.setdefault(channel, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+        else:
+            self.levels[channel] = self.LOW if initial is None else int(bool(initial))
+
+    def output(self, channel, value):
+        # RPi.GPIO also takes a list/tuple of channels with one value or a
+        # matching tuple of values (one batched call)
+        self.writes += 1
+        if isinstance(channel, (list, tuple)):
+            values = value if isinstance(value, (list, tuple)) else [value] * len(channel)
+            for ch, val in zip(channel, values):
+                self._write(ch, val)
+        else:
+            self._write(channel, value)
+
+    def _write(self, channel, value):
+        level = int(bool(value))
+        self.levels[channel] = level
+        if self.record_history:
+            self.history.append((self.clock.monotonic(), channel, level))
+        sensor = self._ultrasonics.get(channel)
+        if sensor is not None:
+            self._trigger_edge(sensor, level)
+
+    def input(self, channel):
+        self.reads += 1
+        self.clock.advance(self.READ_COST)
+        return self.levels.get(channel, self.LOW)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self._edge_detect[channel] = (edge, [callback] if callback else [])
+
+    def add_event_callback(self, channel, callback):
+        self._edge_detect[channel][1].append(callback)
+
+    def remove_event_detect(self, channel):
+        self._edge_detect.pop(channel, None)
+
+    def PWM(self, channel, frequency):
+        return SimPWM(self, channel, frequency)
+
+    def cleanup(self, channel=None):
+        if channel is None:
+            self.pin_modes.clear()
+        else:
+            self.pin_modes.pop(channel, None)
+
+    # --- simulation helpers ---
+    def set_input(self, channel, level):
+        """Drive an input pin right now (button, PIR, ...), firing edge callbacks."""
+        level = int(bool(level))
+        if self.levels.get(channel, self.LOW) == level:
+            return
+        self.levels[channel] = level
+        detect = self._edge_detect.get(channel)
+        if detect is None:
+            return
+        edge, callbacks = detect
+        if edge == self.BOTH or edge == (self.RISING if level else self.FALLING):
+            for callback in list(callbacks):
+                callback(channel)
+
+    def press_button(self, channel, hold=0.2, at=None):
+        """Schedule a button press: HIGH at `at` (default now), LOW `hold` s later."""
+        at = self.clock.monotonic() if at is None else at
+        self.schedule_input(channel, self.HIGH, at)
+        self.schedule_input(channel, self.LOW, at + hold)
+
+    def schedule_input(self, channel, level, at):
+        """Drive an input pin at virtual monotonic time `at`."""
+        self.clock.call_at(at, lambda: self.set_input(channel, level))
+
+    def attach_ultrasonic(self, trig, echo, distance_cm=100.0):
+        """Wire a simulated HC-SR04 to trig/echo. distance_cm=None -> missed echo."""
+        self._ultrasonics[trig] = _Ultrasonic(trig, echo, distance_cm)
+        self.levels.setdefault(echo, self.LOW)
+
+    def set_distance(self, trig, distance_cm):
+        self._ultrasonics[trig].distance_cm = distance_cm
+
+    def _trigger_edge(self, sensor, level):
+        now = self.clock.monotonic()
+        if level:
+            sensor.trig_high_at = now
+            return
+        if sensor.trig_high_at is None or now - sensor.trig_high_at < sensor.MIN_TRIGGER:
+            sensor.trig_high_at = None
+            return
+        sensor.trig_high_at = None
+        if sensor.distance_cm is None:
+            return
+        rise = now + sensor.BURST_DELAY
+        fall = rise + 2.0 * sensor.distance_cm / SPEED_OF_SOUND_CM_S
+        self.schedule_input(sensor.echo, self.HIGH, rise)
+        self.schedule_input(sensor.echo, self.LOW, fall)
+
+
+# -----------------------------
+# SIMULATED NEOPIXELS (rpi_ws281x look-alike)
+# -----------------------------
+def Color(red, green, blue, white=0):
+    """Same packing as rpi_ws281x.Color: 0xWWRRGGBB."""
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+class _SimWs:
+    SK6812_STRIP_GRBW = 0x18100800
+    WS2811_STRIP_GRB = 0x00081000
+
+
+class SimPixelStrip:
+    """Stand-in for rpi_ws281x.PixelStrip that charges realistic show() time."""
+
+    BIT_TIME = 1.25e-6       # 800 kHz data rate
+    RESET_TIME = 80e-6
+
+    def __init__(self, num, pin, freq_hz=800000, dma=10, invert=False,
+                 brightness=255, channel=0, strip_type=None):
+        self.num = num
+        self.brightness = brightness
+        self.pixels = [0] * num
+        self.shown = [0] * num
+        self.show_count = 0
+        self.clock = None                # set by SimBackend
+
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return self.num
+
+    def setPixelColor(self, n, color):
+        self.pixels[n] = color
+
+    def getPixelColor(self, n):
+        return self.pixels[n]
+
+    def setBrightness(self, brightness):
+        self.brightness = brightness
+
+    def show(self):
+        self.show_count += 1
+        self.shown = list(self.pixels)
+        if self.clock is not None:
+            self.clock.sleep(self.num * 32 * self.BIT_TIME + self.RESET_TIME)
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class PiBackend:
+    """Real hardware: RPi.GPIO + rpi_ws281x + the real clock."""
+
+    name = "pi"
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        from rpi_ws281x import PixelStrip, Color, ws
+
+        self.GPIO = GPIO
+        self.PixelStrip = PixelStrip
+        self.Color = Color
+        self.ws = ws
+        self.clock = RealClock()
+
+
+class SimBackend:
+    """Simulated hardware on a virtual clock."""
+
+    name = "sim"
+
+    def __init__(self):
+        self.clock = VirtualClock()
+        self.GPIO = SimGPIO(self.clock)
+        self.Color = Color
+        self.ws = _SimWs
+        self.strips = []
+
+        backend = self
+
+        class _Strip(SimPixelStrip):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.clock = backend.clock
+                backend.strips.append(self)
+
+        self.PixelStrip = _Strip
+
+
+BACKENDS = {"pi": PiBackend, "sim": SimBackend}
+_backend = None
+
+
+def use_backend(name):
+    """Select (and create) the backend. Call before importing main.py."""
+    global _backend
+    try:
+        _backend = BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown hardware backend {name!r} (expected one of {sorted(BACKENDS)})")
+    return _backend
+
+
+def get_backend():
+    """Return the active backend, creating it from DONATION_BACKEND if needed."""
+    if _backend is None:
+        use_backend(os.environ.get("DONATION_BACKEND", "pi"))
+    return _backend
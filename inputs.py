@@ -0,0 +1,122 @@
+# inputs.py
+# Edge-triggered inputs (button, PIR) instead of sleep() polling
+#
+# How it works:
+# - watch() turns on GPIO edge detection for a pin. RPi.GPIO calls _on_edge()
+#   from its own thread the moment the pin changes.
+# - Each edge is timestamped with the monotonic clock. Edges closer together
+#   than the pin's debounce time are treated as contact bounce and dropped.
+#   Because a dropped edge may have been the last real change (a tap shorter
+#   than the debounce time), the pin is read again once the debounce time is
+#   over and the stored level is corrected if it differs - otherwise the next
+#   real press would look like "no change" and be lost.
+# - Accepted edges update the pin's WatchedInput (level, last_edge, ...).
+#   No polling -> idle CPU is ~0.
+# - Other modules can add_listener() to a WatchedInput to hear every accepted
+#   edge (level, timestamp) as it happens (e.g. the PIR history, the donor
+#   admission queue).
+
+import threading
+
+
+class WatchedInput:
+    """Latest debounced state of one watched pin."""
+
+    def __init__(self, name, pin, level, debounce):
+        self.name = name
+        self.pin = pin
+        self.level = level
+        self.debounce = debounce
+        self.last_edge = None        # monotonic timestamp of last accepted edge
+        self.edge_count = 0          # accepted edges so far
+        self.recheck_pending = False # a re-read after the debounce time is scheduled
+        self.changed = threading.Event()
+        self.listeners = []          # fn(level, timestamp) per accepted edge
+
+    def add_listener(self, fn):
+        self.listeners.append(fn)
+
+    def wait_change(self, clock, seen_count, timeout=None):
+        """
+        Wait until edge_count moves past `seen_count` (or timeout).
+        Returns True if a new edge arrived.
+        """
+        self.changed.clear()
+        if self.edge_count != seen_count:
+            return True
+        clock.wait(self.changed, timeout)
+        return self.edge_count != seen_count
+
+
+class EdgeInputs:
+    """GPIO edge detection + timestamp debounce."""
+
+    def __init__(self, gpio, clock):
+        self.gpio = gpio
+        self.clock = clock
+        self.pins = {}                       # pin -> WatchedInput
+        self.by_name = {}                    # name -> WatchedInput
+        self._lock = threading.Lock()
+
+    def watch(self, pin, name, debounce=0.0):
+        """Start edge detection on `pin` (already set up as an input)."""
+        watched = WatchedInput(name, pin, self.gpio.input(pin), debounce)
+        self.pins[pin] = watched
+        self.by_name[name] = watched
+        self.gpio.add_event_detect(pin, self.gpio.BOTH, callback=self._on_edge)
+        return watched
+
+    def close(self):
+        for pin in list(self.pins):
+            self.gpio.remove_event_detect(pin)
+        self.pins.clear()
+        self.by_name.clear()
+
+    def _on_edge(self, channel):
+        """GPIO callback thread: timestamp, debounce, record, notify."""
+        ts = self.clock.monotonic()
+        level = self.gpio.input(channel)
+        watched = self.pins.get(channel)
+        if watched is None:
+            return
+
+        with self._lock:
+            if level == watched.level:
+                return                       # bounce that settled back
+            if watched.last_edge is not None and ts - watched.last_edge < watched.debounce:
+                # too soon after the last edge; look again once the pin settled
+                if not watched.recheck_pending:
+                    watched.recheck_pending = True
+                    self._schedule_recheck(watched, watched.last_edge + watched.debounce - ts)
+                return
+            self._record(watched, level, ts)
+        self._notify(watched, level, ts)
+
+    def _schedule_recheck(self, watched, delay):
+        if self.clock.virtual:
+            self.clock.call_later(delay, lambda: self._recheck(watched))
+        else:
+            timer = threading.Timer(delay, self._recheck, args=(watched,))
+            timer.daemon = True
+            timer.start()
+
+    def _recheck(self, watched):
+        """Debounce time is over: if the pin now differs from the stored level, that's an edge."""
+        ts = self.clock.monotonic()
+        level = self.gpio.input(watched.pin)
+        with self._lock:
+            watched.recheck_pending = False
+            if self.pins.get(watched.pin) is not watched or level == watched.level:
+                return
+            self._record(watched, level, ts)
+        self._notify(watched, level, ts)
+
+    def _record(self, watched, level, ts):
+        watched.level = level
+        watched.last_edge = ts
+        watched.edge_count += 1
+
+    def _notify(self, watched, level, ts):
+        for listener in watched.listeners:
+            listener(level, ts)
+        watched.changed.set()
@@ -0,0 +1,158 @@
+# ledger.py
+# Durable donation ledger (SQLite, WAL mode, written off the control thread)
+#
+# How it works:
+# - Every button press ends in one cycle record: when it started/finished,
+#   what the sensors saw and the outcome (donated / motion_blocked /
+#   no_object).
+# - record() only updates the in-memory counters and puts the row on a
+#   queue. A background writer thread collects rows for up to
+#   batch_interval seconds (or batch_size rows) and commits them in ONE
+#   transaction, so the control loop never waits on an SD-card fsync.
+# - A small `totals` table is updated in the same transaction, so the
+#   counters are restored at startup with a single tiny query.
+# - If a commit fails (SD card full, locked, I/O error) the rows stay queued
+#   and are written again after retry_delay together with newer rows, so the
+#   persisted totals catch up with the in-memory counts once writing works
+#   again. Failures are reported through the `log` function (main.py passes
+#   log_and_print, so they show up in /logs too).
+
+import queue
+import sqlite3
+import threading
+
+OUTCOME_DONATED = "donated"
+OUTCOME_MOTION_BLOCKED = "motion_blocked"
+OUTCOME_NO_OBJECT = "no_object"
+OUTCOMES = (OUTCOME_DONATED, OUTCOME_MOTION_BLOCKED, OUTCOME_NO_OBJECT)
+
+BATCH_INTERVAL = 1.0    # seconds a row may wait before it is committed
+BATCH_SIZE = 50         # commit early once this many rows are waiting
+RETRY_DELAY = 5.0       # seconds before rows from a failed commit are written again
+BUSY_TIMEOUT = 5.0      # seconds SQLite waits for a locked database before a commit fails
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id           INTEGER PRIMARY KEY,
+    started_at   REAL NOT NULL,      -- unix time
+    finished_at  REAL NOT NULL,      -- unix time
+    outcome      TEXT NOT NULL,
+    distance1_cm REAL,               -- NULL = no echo
+    distance2_cm REAL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    outcome TEXT PRIMARY KEY,
+    count   INTEGER NOT NULL
+);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")   # WAL + NORMAL: no fsync per commit
+    return conn
+
+
+class DonationLedger:
+    """Cycle history + outcome totals, persisted by a batching writer thread."""
+
+    def __init__(self, path, batch_interval=BATCH_INTERVAL, batch_size=BATCH_SIZE,
+                 retry_delay=RETRY_DELAY, log=print):
+        self.path = path
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.log = log
+        self.batches = 0                 # commits done by the writer
+        self.errors = 0
+        self.unsaved = 0                 # rows waiting for a retry after a failed commit
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        conn = _connect(path)
+        with conn:
+            conn.executescript(SCHEMA)
+            rows = conn.execute("SELECT outcome, count FROM totals").fetchall()
+        conn.close()
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.counts.update(dict(rows))
+
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def count(self, outcome):
+        with self._lock:
+            return self.counts.get(outcome, 0)
+
+    def record(self, outcome, started_at, finished_at, distance1=None, distance2=None):
+        """Count the cycle now; persist it in the background. Never blocks."""
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        self._queue.put((started_at, finished_at, outcome, distance1, distance2))
+
+    def close(self, timeout=5.0):
+        """Flush everything still queued and stop the writer."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = _connect(self.path)
+        batch = []                       # rows not committed yet (incl. a failed batch)
+        stopping = False
+        while not stopping:
+            # with rows from a failed commit waiting, try again after
+            # retry_delay even if nothing new arrives
+            stopping = self._gather(batch, self.retry_delay if batch else None)
+            if batch and self._write(conn, batch):
+                batch = []
+        if batch:
+            self.log(f"Ledger: {len(batch)} cycles could not be saved before exit.")
+        conn.close()
+
+    def _gather(self, batch, timeout):
+        """Add queued rows to `batch` (up to batch_size); True once close() was called."""
+        try:
+            row = self._queue.get(timeout=timeout)
+            if row is None:
+                return True
+            batch.append(row)
+            # gather whatever else arrives within batch_interval
+            while len(batch) < self.batch_size:
+                row = self._queue.get(timeout=self.batch_interval)
+                if row is None:
+                    return True
+                batch.append(row)
+        except queue.Empty:
+            pass
+        return False
+
+    def _write(self, conn, batch):
+        """Commit `batch` in one transaction; False (rows kept for a retry) on failure."""
+        per_outcome = {}
+        for row in batch:
+            per_outcome[row[2]] = per_outcome.get(row[2], 0) + 1
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO cycles (started_at, finished_at, outcome, distance1_cm, distance2_cm) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+                conn.executemany(
+                    "INSERT INTO totals (outcome, count) VALUES (?, ?) "
+                    "ON CONFLICT(outcome) DO UPDATE SET count = count + excluded.count",
+                    list(per_outcome.items()),
+                )
+        except sqlite3.Error as exc:
+            self.errors += 1
+            if not self.unsaved:
+                self.log(f"Ledger write failed ({len(batch)} cycles waiting, "
+                         f"retrying every {self.retry_delay:g} s): {exc}")
+            self.unsaved = len(batch)
+            return False
+        if self.unsaved:
+            self.log(f"Ledger write recovered: {len(batch)} cycles saved.")
+        self.unsaved = 0
+        self.batches += 1
+        return True
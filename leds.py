@@ -0,0 +1,205 @@
+# leds.py
+# NeoPixel status animations on their own thread
+#
+# How it works:
+# - LedAnimator owns the PixelStrip. Nobody else calls setPixelColor/show().
+# - The control loop only calls play(animation), which drops a declarative
+#   command (Solid / Flash / Pulse) into a queue and returns immediately.
+# - The animator thread takes the NEWEST command (older queued ones are
+#   simply replaced), works out what every pixel should look like right now,
+#   and calls strip.show() at most once per frame - and only if something
+#   actually changed. Between changes it sleeps until the next frame is due.
+# - On the simulated (virtual) clock there is no thread: frames are scheduled
+#   with clock.call_at() instead.
+
+import collections
+import math
+import threading
+
+FRAME_TIME = 1.0 / 50   # fastest animation frame rate (seconds per frame)
+
+
+def scale_color(color, factor):
+    """Scale every channel of a packed 0xWWRRGGBB color by factor (0..1)."""
+    out = 0
+    for shift in (24, 16, 8, 0):
+        channel = (color >> shift) & 0xFF
+        out |= int(channel * factor + 0.5) << shift
+    return out
+
+
+class Solid:
+    """Fixed colors, one per pixel."""
+
+    def __init__(self, colors, duration=None, then=None):
+        self.colors = tuple(colors)
+        self.duration = duration
+        self.then = then
+
+    def frame(self, t):
+        return self.colors
+
+    def next_frame(self, t):
+        return None
+
+
+class Flash:
+    """Alternate between `on` and `off` colors, half a period each (ON first)."""
+
+    def __init__(self, on, off, period, duration=None, then=None):
+        self.on = tuple(on)
+        self.off = tuple(off)
+        self.half = period / 2
+        self.duration = duration
+        self.then = then
+
+    def _half_periods(self, t):
+        # small epsilon so a frame scheduled exactly on a boundary counts as past it
+        return int(t / self.half + 1e-9)
+
+    def frame(self, t):
+        return self.on if self._half_periods(t) % 2 == 0 else self.off
+
+    def next_frame(self, t):
+        return (self._half_periods(t) + 1) * self.half
+
+
+class Pulse:
+    """Smoothly fade `colors` in and out over `period` seconds."""
+
+    def __init__(self, colors, period, duration=None, then=None, frame_time=FRAME_TIME):
+        self.colors = tuple(colors)
+        self.period = period
+        self.duration = duration
+        self.then = then
+        self.frame_time = frame_time
+
+    def frame(self, t):
+        level = 0.5 - 0.5 * math.cos(2 * math.pi * t / self.period)
+        return tuple(scale_color(c, level) for c in self.colors)
+
+    def next_frame(self, t):
+        return t + self.frame_time
+
+
+class LedAnimator:
+    """Owns the strip; plays the latest requested animation."""
+
+    def __init__(self, strip, clock, frame_time=FRAME_TIME):
+        self.strip = strip
+        self.clock = clock
+        self.frame_time = frame_time     # minimum time between two show() calls
+        self.shows = 0                   # strip.show() calls so far
+        self.shown = None                # colors currently on the strip
+        self.last_show = float("-inf")   # monotonic time of the last show()
+        self._commands = collections.deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._anim = None
+        self._anim_start = 0.0
+        self._generation = 0             # sim: invalidates stale frame callbacks
+
+    def play(self, animation):
+        """Switch to `animation` (non-blocking)."""
+        if self.clock.virtual:
+            self._set(animation, self.clock.monotonic())
+            self._sim_tick(self._generation)
+            return
+        self._commands.append(animation)
+        self._ensure_thread()
+        self._wake.set()
+
+    def stop(self, final=None):
+        """Show `final` (if given), then stop the thread."""
+        if self.clock.virtual:
+            if final is not None:
+                self.play(final)
+            self._generation += 1
+            return
+        if final is not None:
+            self._commands.append(final)
+        with self._lock:
+            if self._thread is None:
+                if final is not None:
+                    self._set(final, self.clock.monotonic())
+                    self._render(self.clock.monotonic())
+                return
+            self._commands.append(None)
+            self._wake.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # --- internals ---
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="led-animator", daemon=True)
+                self._thread.start()
+
+    def _set(self, animation, now):
+        self._anim = animation
+        self._anim_start = now
+        self._generation += 1
+
+    def _render(self, now):
+        """Bring the strip up to date; return when the next frame is due (or None)."""
+        anim = self._anim
+        if anim is None:
+            return None
+
+        # chained animations (e.g. flash for 3 s, then idle)
+        while anim.duration is not None and now - self._anim_start >= anim.duration - 1e-9:
+            end = self._anim_start + anim.duration
+            anim = anim.then or Solid([0] * self.strip.numPixels())
+            self._anim = anim
+            self._anim_start = end
+
+        t = now - self._anim_start
+        colors = anim.frame(t)
+        if colors != self.shown:
+            previous = self.shown or (None,) * len(colors)
+            for i, (new, old) in enumerate(zip(colors, previous)):
+                if new != old:
+                    self.strip.setPixelColor(i, new)
+            self.strip.show()
+            self.shows += 1
+            self.shown = colors
+            self.last_show = now
+
+        next_t = anim.next_frame(t)
+        if anim.duration is not None:
+            next_t = anim.duration if next_t is None else min(next_t, anim.duration)
+        return None if next_t is None else self._anim_start + next_t
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            stop = False
+            latest = None
+            while self._commands:
+                cmd = self._commands.popleft()
+                if cmd is None:
+                    stop = True
+                else:
+                    latest = cmd
+            now = self.clock.monotonic()
+            if latest is not None:
+                self._set(latest, now)
+            next_at = self._render(now)
+            if stop:
+                return
+            # at most one show() per frame: commands that arrive meanwhile
+            # collapse into the newest one, rendered once the frame is over
+            hold = self.last_show + self.frame_time - self.clock.monotonic()
+            if hold > 0:
+                self.clock.sleep(hold)
+            timeout = None if next_at is None else max(0.0, next_at - self.clock.monotonic())
+            self.clock.wait(self._wake, timeout)
+
+    def _sim_tick(self, generation):
+        if generation != self._generation:
+            return                       # a newer animation took over
+        next_at = self._render(self.clock.monotonic())
+        if next_at is not None:
+            self.clock.call_at(next_at, lambda: self._sim_tick(generation))
@@ -0,0 +1,231 @@
+# loadtest.py
+# Many kiosk displays / phones polling the status page at once
+#
+# How it works:
+# - Starts the status web server locally (same WebServer as main.py, on a
+#   free port) - or targets a running box with --url.
+# - N poller threads each request /status_json every --interval seconds
+#   (0 = back to back), like the page's polling fallback. --etag sends
+#   If-None-Match the way a browser revalidates.
+# - Reports p50/p95/p99 latency, error rate and throughput.
+# - --cycle also runs the door motor moves (open + close, back to back) on a
+#   real-time stepper engine with stand-in GPIO while the pollers run, first
+#   without load as a baseline, then under load, and reports the step-timing
+#   jitter of both. The status page changes along with the moves, so the
+#   server keeps rebuilding its status snapshot too.
+#
+# Examples:
+#   python3 loadtest.py --pollers 20 --duration 10
+#   python3 loadtest.py --pollers 50 --interval 0 --cycle
+#   python3 loadtest.py --url http://<pi-ip>:5000 --pollers 10
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.parse
+
+from simulate import setup_sim
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Poller(threading.Thread):
+    """One simulated display polling a path until `stop_at`."""
+
+    def __init__(self, host, port, path, interval, stop_at, use_etag):
+        super().__init__(daemon=True)
+        self.host, self.port, self.path = host, port, path
+        self.interval = interval
+        self.stop_at = stop_at
+        self.use_etag = use_etag
+        self.latencies = []
+        self.errors = 0
+        self.not_modified = 0
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        etag = None
+        # spread the first requests over one interval, like displays switched on at random
+        next_at = time.monotonic() + random.random() * self.interval
+        while True:
+            delay = min(next_at, self.stop_at) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if time.monotonic() >= self.stop_at:
+                break
+            headers = {"If-None-Match": etag} if (self.use_etag and etag) else {}
+            start = time.perf_counter()
+            try:
+                conn.request("GET", self.path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    self.errors += 1
+                else:
+                    self.latencies.append(time.perf_counter() - start)
+                    if response.status == 304:
+                        self.not_modified += 1
+                    etag = response.getheader("ETag", etag)
+                if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+            next_at = max(next_at + self.interval, time.monotonic()) if self.interval else time.monotonic()
+        conn.close()
+
+
+def run_moves(engine, main, stop_at, webserver):
+    """Open + close the doors back to back until stop_at; returns JitterStats list."""
+    from status_events import StatusEvent
+    stats = []
+    while time.monotonic() < stop_at:
+        webserver.log_and_print("Motors FORWARD (opening doors)...", StatusEvent.DOORS_OPENING)
+        stats.append(engine.move(main.forward_plans()).wait())
+        webserver.log_and_print("Motors BACKWARD (closing doors)...", StatusEvent.DOORS_CLOSING)
+        stats.append(engine.move(main.backward_plans()).wait())
+    return stats
+
+
+def summarize_jitter(stats):
+    if not stats:
+        return {"moves": 0}
+    return {
+        "moves": len(stats),
+        "frames": sum(s.frames for s in stats),
+        "mean_late_ms": statistics.fmean(s.mean_late for s in stats) * 1000,
+        "max_late_ms": max(s.max_late for s in stats) * 1000,
+        "mean_stdev_ms": statistics.fmean(s.stdev for s in stats) * 1000,
+    }
+
+
+def run_load(args, host, port, engine=None, main=None, webserver=None):
+    stop_at = time.monotonic() + args.duration
+    pollers = [
+        Poller(host, port, args.path, args.interval, stop_at, args.etag)
+        for _ in range(args.pollers)
+    ]
+    moves = None
+    mover = None
+    if engine is not None:
+        moves = []
+        mover = threading.Thread(
+            target=lambda: moves.extend(run_moves(engine, main, stop_at, webserver)), daemon=True
+        )
+
+    start = time.perf_counter()
+    for p in pollers:
+        p.start()
+    if mover is not None:
+        mover.start()
+    for p in pollers:
+        p.join()
+    elapsed = time.perf_counter() - start
+    if mover is not None:
+        mover.join()                     # finishes the open/close pair in progress
+
+    latencies = sorted(x for p in pollers for x in p.latencies)
+    ok = len(latencies)
+    errors = sum(p.errors for p in pollers)
+    total = ok + errors
+    result = {
+        "pollers": args.pollers,
+        "interval_s": args.interval,
+        "duration_s": elapsed,
+        "requests": total,
+        "throughput_per_s": ok / elapsed if elapsed else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "not_modified": sum(p.not_modified for p in pollers),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+    if moves is not None:
+        result["step_jitter"] = summarize_jitter(moves)
+    return result
+
+
+def main_cli(args):
+    from hardware import RealClock, SimGPIO
+    from stepper import StepperEngine
+
+    report = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        hw, main = setup_sim(12.0)       # main.py config (pins, plans) without a Pi
+        import webserver2
+
+        if args.url:
+            parsed = urllib.parse.urlsplit(args.url)
+            host, port = parsed.hostname, parsed.port or 80
+            server = None
+        else:
+            server = webserver2.start_web_server("127.0.0.1", 0, workers=args.workers)
+            if not server.wait_ready(5.0):
+                raise SystemExit(f"web server did not start: {server.error}")
+            host, port = "127.0.0.1", server.port
+
+        engine = None
+        if args.cycle:
+            clock = RealClock()
+            gpio = SimGPIO(clock)
+            gpio.record_history = False
+            engine = StepperEngine(gpio, clock, main.sequence)
+            baseline_stop = time.monotonic() + min(args.duration, 5.0)
+            report["step_jitter_idle"] = summarize_jitter(run_moves(engine, main, baseline_stop, webserver2))
+
+        report["load"] = run_load(args, host, port, engine, main, webserver2)
+
+        if engine is not None:
+            engine.stop()
+        if server is not None:
+            webserver2.stop_web_server()
+        webserver2.flush_logs()
+
+    load = report["load"]
+    target = args.url or f"local server ({args.workers or webserver2.WEB_WORKERS} workers)"
+    print(f"target:      {target}{args.path}")
+    print(f"pollers:     {load['pollers']} every {args.interval:g} s for {load['duration_s']:.1f} s")
+    print(f"requests:    {load['requests']}  ({load['throughput_per_s']:.1f}/s, "
+          f"errors {load['error_rate']:.2%}, 304s {load['not_modified']})")
+    print(f"latency ms:  p50 {load['p50_ms']:.2f}  p95 {load['p95_ms']:.2f}  "
+          f"p99 {load['p99_ms']:.2f}  max {load['max_ms']:.2f}")
+    if args.cycle:
+        for label, jitter in (("idle", report["step_jitter_idle"]), ("loaded", load["step_jitter"])):
+            if jitter["moves"]:
+                print(f"step jitter ({label}): {jitter['moves']} moves, late avg {jitter['mean_late_ms']:.2f} ms"
+                      f" / max {jitter['max_late_ms']:.2f} ms (stdev {jitter['mean_stdev_ms']:.2f} ms)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results:     {args.json}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulate many displays polling the status page")
+    parser.add_argument("--pollers", type=int, default=10, help="number of simulated displays")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between polls per display (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--path", default="/status_json", help="path to poll")
+    parser.add_argument("--etag", action="store_true", help="revalidate with If-None-Match like a browser")
+    parser.add_argument("--workers", type=int, default=None, help="local server worker threads")
+    parser.add_argument("--url", help="poll a running box instead of a local server")
+    parser.add_argument("--cycle", action="store_true",
+                        help="run door moves at the same time and report step-timing jitter")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    return parser
+
+
+if __name__ == "__main__":
+    main_cli(build_parser().parse_args())
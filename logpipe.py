@@ -0,0 +1,81 @@
+# logpipe.py
+# Asynchronous log pipeline: cheap enqueue on the control thread,
+# formatting / printing / status mapping on a background consumer.
+#
+# How it works:
+# - submit() appends a ready-made record tuple to a bounded deque
+#   (deque.append is atomic under the GIL, no lock taken) and only pokes the
+#   consumer's Event if the consumer is actually asleep.
+# - The consumer thread pops records in order and hands each one to the
+#   `consume` function (print, log buffer, website status, ...).
+# - If the consumer falls behind by more than `capacity` records the OLDEST
+#   ones are dropped (and counted) instead of ever blocking the producer.
+# - flush() waits until everything submitted so far has been consumed.
+
+import collections
+import threading
+
+CAPACITY = 1000         # records that may wait for the consumer
+
+
+class LogPipeline:
+    """Bounded single-consumer queue of log records."""
+
+    def __init__(self, consume, capacity=CAPACITY):
+        self.consume = consume
+        self.capacity = capacity
+        self.submitted = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._records = collections.deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._sleeping = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, record):
+        """Hot path: enqueue one record. Never blocks on I/O."""
+        if self._thread is None:
+            self._start()
+        if len(self._records) == self.capacity:
+            self.dropped += 1            # deque(maxlen) pushes out the oldest
+        self._records.append(record)
+        self.submitted += 1
+        if self._sleeping:
+            self._wake.set()
+
+    def flush(self, timeout=2.0):
+        """Block until the consumer has caught up (or timeout). True if drained."""
+        if self._thread is None:
+            return True
+        self._idle.clear()
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-pipeline", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        records = self._records
+        while True:
+            while records:
+                try:
+                    self.consume(records.popleft())
+                except Exception:
+                    self.errors += 1
+                self.consumed += 1
+
+            # going to sleep: announce it, then re-check so no wakeup is lost
+            self._wake.clear()
+            self._sleeping = True
+            if records:
+                self._sleeping = False
+                continue
+            self._idle.set()
+            self._wake.wait()
+            self._sleeping = False
@@ -0,0 +1,61 @@
+# logstore.py
+# Fixed-size in-memory log store with sequence numbers (for the /logs endpoint)
+#
+# How it works:
+# - Every stored line gets the next sequence number (1, 2, 3, ...), which
+#   never repeats while the program runs.
+# - Lines live in a deque(maxlen=capacity): once full, storing a new line
+#   pushes out the oldest one in O(1) (no list trimming).
+# - since(seq) returns only the lines NEWER than `seq`, walking back from the
+#   newest line, so a client that polls with its last seen number costs
+#   O(new lines), not O(whole buffer).
+# - If a client fell so far behind that lines it never saw were already
+#   pushed out, since() reports how many were missed.
+
+import collections
+import threading
+
+CAPACITY = 300          # lines kept in memory
+
+
+class LogStore:
+    """Ring buffer of (seq, time, message) entries."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.last_seq = 0                # seq of the newest entry (0 = none yet)
+        self._entries = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, message):
+        """Store one line; returns its sequence number."""
+        with self._lock:
+            self.last_seq += 1
+            self._entries.append((self.last_seq, timestamp, message))
+            return self.last_seq
+
+    def since(self, seq=0, limit=None):
+        """
+        Entries with a sequence number > seq, oldest first.
+        Returns (entries, missed): missed = lines newer than seq that were
+        already pushed out of the buffer.
+        A seq from the future (e.g. the program restarted) or a negative one
+        counts as 0.
+        """
+        with self._lock:
+            if seq < 0 or seq > self.last_seq:
+                seq = 0
+            newer = []
+            for entry in reversed(self._entries):
+                if entry[0] <= seq:
+                    break
+                newer.append(entry)
+            oldest = self._entries[0][0] if self._entries else self.last_seq + 1
+        newer.reverse()
+        missed = max(0, oldest - seq - 1)
+        if limit is not None and len(newer) > limit:
+            newer = newer[:limit]
+        return newer, missed
+
+    def __len__(self):
+        return len(self._entries)
@@ -2,29 +2,56 @@
 # + Solenoid lock + conveyor belt + Servo lock indicator (Sol)
 # + NeoPixel status LEDs (Sol)
 
-import RPi.GPIO as GPIO
-import time
-from time import sleep
+import os
 
-PROGRAM_START = time.time()
+# All hardware + time goes through hardware.py so the same code runs on the
+# Pi ("pi" backend) or fully simulated on a virtual clock ("sim" backend).
+from hardware import get_backend
+
+hw = get_backend()
+GPIO = hw.GPIO
+clock = hw.clock
+sleep = clock.sleep
+
+PROGRAM_START = clock.time()
 PIR_STARTUP_IGNORE = 30.0  # seconds to ignore PIR after startup
 # <<< NEW LED CODE >>>
-from rpi_ws281x import PixelStrip, Color, ws
+PixelStrip, Color, ws = hw.PixelStrip, hw.Color, hw.ws
 
 # >>> NEW: web log server imports <<<
-from webserver2 import start_web_server, log_and_print
-start_web_server()
+from webserver2 import start_web_server, stop_web_server, log_and_print, flush_logs, set_donation_total
+from status_events import StatusEvent
+from inputs import EdgeInputs
+from admission import AdmissionQueue
+from ledger import DonationLedger, OUTCOME_DONATED, OUTCOME_MOTION_BLOCKED, OUTCOME_NO_OBJECT
+from pir_monitor import PirMonitor
+from stepper import StepperEngine, MotorMove, format_stats
+from cycle import Stage, CycleScheduler, validate
+from leds import LedAnimator, Solid, Flash
+from servo import ServoController
+from ranging import Ultrasonic, RangingScheduler, DistanceSampler, NO_ECHO, format_distance
+from metrics import REGISTRY
+from tracing import TRACER, traced
 
 GPIO.setmode(GPIO.BOARD)
 GPIO.setwarnings(False)
 
-# >>> NEW: start Flask server in background <<<
-start_web_server()
+# Spans (when tracing is switched on) use the same clock as the hardware
+TRACER.timer = clock.perf_counter
 
 # -----------------------------
-# DONATION COUNTER
+# DONATION COUNTER (persistent ledger)
 # -----------------------------
-donation_count = 0   # increments each time doors safely open & close
+# Every cycle is recorded in SQLite by a background writer; the counter
+# survives restarts.
+LEDGER_PATH = os.environ.get(
+    "DONATION_LEDGER",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "donations.db"),
+)
+ledger = DonationLedger(LEDGER_PATH, log=log_and_print)
+
+donation_count = ledger.count(OUTCOME_DONATED)   # increments each time doors safely open & close
+set_donation_total(donation_count)
 
 # -----------------------------
 # Ultrasonic Sensors (BOARD Mode)
@@ -82,6 +109,32 @@ motor2_pins = [M2_IN1, M2_IN2, M2_IN3, M2_IN4]
 BUTTON_PIN = 36
 GPIO.setup(BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
 
+BUTTON_DEBOUNCE = 0.03   # edges closer than this (seconds) are contact bounce
+
+# -----------------------------
+# EDGE-TRIGGERED INPUTS (no polling)
+# -----------------------------
+inputs = EdgeInputs(GPIO, clock)
+button_input = inputs.watch(BUTTON_PIN, "button", debounce=BUTTON_DEBOUNCE)
+pir_input = inputs.watch(PIR_PIN, "pir")
+
+# -----------------------------
+# DONOR ADMISSION QUEUE
+# -----------------------------
+# Presses go straight from the GPIO callback into the queue, even while a
+# cycle is running; repeated presses by the same donor are merged.
+DONOR_COALESCE_WINDOW = 2.0   # seconds; presses closer than this = same donor
+DONOR_QUEUE_MAX       = 10    # waiting donors beyond this are dropped
+
+admission = AdmissionQueue(clock, coalesce_window=DONOR_COALESCE_WINDOW,
+                           max_depth=DONOR_QUEUE_MAX)
+
+def _on_button_edge(level, timestamp):
+    if level == GPIO.HIGH:
+        admission.press(timestamp)
+
+button_input.add_listener(_on_button_edge)
+
 # -----------------------------
 # CONVEYOR BELT RELAY
 # -----------------------------
@@ -101,16 +154,19 @@ GPIO.setup(SERVO_PIN, GPIO.OUT)
 servo_pwm = GPIO.PWM(SERVO_PIN, 50)
 servo_pwm.start(0)
 
+SERVO_SETTLE_TIME = 0.3   # seconds before pulses stop (reduces jitter)
+
+# Moves + pulse shutoff run in the background; same-angle moves are skipped
+servo = ServoController(servo_pwm, clock, settle=SERVO_SETTLE_TIME)
+
+@traced("set_servo_angle")
 def set_servo_angle(angle):
     """
     0°  = servo DOWN  -> door locked
     180° = servo UP   -> door unlocked
+    Returns right away with a ServoMove; call .wait() only if you must.
     """
-    duty = 2 + (angle / 18.0)    # 0°->~2%, 180°->~12%
-    servo_pwm.ChangeDutyCycle(duty)
-    sleep(0.3)
-    # Optional: stop sending pulses to reduce jitter
-    servo_pwm.ChangeDutyCycle(0)
+    return servo.move(angle)
 
 # -----------------------------
 # SOLENOID LOCK (via H-bridge)
@@ -129,19 +185,30 @@ GPIO.setup(LOCK_LEFT4, GPIO.OUT)
 
 LOCK_RELEASE_TIME = 0.5  # small delay after unlocking before moving doors
 
+def solenoids_engage():
+    """Solenoid OFF: IN1=LOW, IN2=LOW (door locked)."""
+    GPIO.output(LOCK_RIGHT1, GPIO.LOW)
+    GPIO.output(LOCK_RIGHT2, GPIO.LOW)
+    GPIO.output(LOCK_LEFT3, GPIO.LOW)
+    GPIO.output(LOCK_LEFT4, GPIO.LOW)
+
+def solenoids_release():
+    """Solenoid ON: IN1=HIGH, IN2=LOW (door unlocked)."""
+    GPIO.output(LOCK_RIGHT1, GPIO.HIGH)
+    GPIO.output(LOCK_RIGHT2, GPIO.LOW)
+    GPIO.output(LOCK_LEFT3, GPIO.HIGH)
+    GPIO.output(LOCK_LEFT4, GPIO.LOW)
+
 def lock_engage():
     """
     Lock ON (door locked).
     Solenoid OFF: IN1=LOW, IN2=LOW
     + Servo DOWN (0°)
     """
-    GPIO.output(LOCK_RIGHT1, GPIO.LOW)
-    GPIO.output(LOCK_RIGHT2, GPIO.LOW)
-    GPIO.output(LOCK_LEFT3, GPIO.LOW)
-    GPIO.output(LOCK_LEFT4, GPIO.LOW)
-
-    set_servo_angle(0)  # servo down = locked
-    log_and_print("Lock engaged (door locked). Servo down.")
+    solenoids_engage()
+    move = set_servo_angle(0)  # servo down = locked
+    log_and_print("Lock engaged (door locked). Servo down.", StatusEvent.LOCK_ENGAGED)
+    return move
 
 def lock_release():
     """
@@ -149,13 +216,10 @@ def lock_release():
     Solenoid ON: IN1=HIGH, IN2=LOW
     + Servo UP (180°)
     """
-    GPIO.output(LOCK_RIGHT1, GPIO.HIGH)
-    GPIO.output(LOCK_RIGHT2, GPIO.LOW)
-    GPIO.output(LOCK_LEFT3, GPIO.HIGH)
-    GPIO.output(LOCK_LEFT4, GPIO.LOW)
-
-    set_servo_angle(180)  # servo up = unlocked
-    log_and_print("Lock released (door unlocked). Servo up.")
+    solenoids_release()
+    move = set_servo_angle(180)  # servo up = unlocked
+    log_and_print("Lock released (door unlocked). Servo up.", StatusEvent.LOCK_RELEASED)
+    return move
 
 # Start with lock ON (engaged)
 lock_engage()
@@ -195,7 +259,6 @@ S1_DETECT_CM      = 20.0   # Sensor 1: object if < this distance
 S2_DETECT_CM      = 10.0   # Sensor 2: object if < this distance
 
 PIR_OBSERVE_TIME  = 5.0    # seconds to watch PIR for motion
-PIR_POLL_INTERVAL = 0.1    # how often to sample PIR during check (seconds)
 PIR_MIN_MOTION_TIME = 5.0
 
 DOOR_OPEN_DELAY   = 2.0    # time doors stay open before closing (seconds)
@@ -232,299 +295,511 @@ strip = PixelStrip(
 )
 strip.begin()
 
+# The animator thread owns the strip; led_* helpers only post a state.
+leds = LedAnimator(strip, clock)
+
+LED_OFF   = Color(0, 0, 0, 0)
+LED_GREEN = Color(255, 0, 0)       # R,G,B,(W) -> shows green on this strip
+LED_RED   = Color(0, 255, 0)       # shows red on this strip
+LED_WHITE = Color(0, 0, 0, 255)    # pure white using W channel
+
+# Idle: system ready / waiting for next donation -> LED 0 GREEN, LED 1 WHITE
+LED_IDLE = Solid([LED_GREEN, LED_WHITE])
+# Safe: donation allowed / doors will open -> LED 0 RED solid, LED 1 OFF
+LED_SAFE = Solid([LED_RED, LED_OFF])
+LED_ALL_OFF = Solid([LED_OFF] * LED_COUNT)
+
+@traced("led_all_off")
 def led_all_off():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0, 0))
-    strip.show()
+    leds.play(LED_ALL_OFF)
 
+@traced("led_idle")
 def led_idle():
     """
     Idle: system ready / waiting for next donation
     -> LED 0 GREEN solid
        LED 1 WHITE solid
     """
-    # LED 0: green
-    strip.setPixelColor(0, Color(255, 0, 0))      # R,G,B,(W)
-    # LED 1: white using W channel
-    strip.setPixelColor(1, Color(0, 0, 0, 255))   # pure white
-    strip.show()
+    leds.play(LED_IDLE)
 
+@traced("led_safe")
 def led_safe():
     """
     Safe: donation allowed / doors will open
     -> LED 0 RED solid
        LED 1 OFF
     """
-    strip.setPixelColor(0, Color(0, 255, 0))      # red
-    strip.setPixelColor(1, Color(0, 0, 0, 0))     # off
-    strip.show()
+    leds.play(LED_SAFE)
 
+@traced("led_not_safe_flash")
 def led_not_safe_flash(duration=3.0, period=0.4):
     """
     Not safe: PIR saw motion, user should check box and try again.
     -> LED 0 FLASHING RED, LED 1 OFF, then back to idle (green+white)
+    Runs on the animator thread; returns immediately.
     """
-    # make sure LED 1 is off during flashing
-    strip.setPixelColor(1, Color(0, 0, 0, 0))
-    strip.show()
-
-    end_time = time.time() + duration
-    while time.time() < end_time:
-        # ON (red)
-        strip.setPixelColor(0, Color(0, 255, 0))
-        strip.show()
-        time.sleep(period / 2)
-
-        # OFF
-        strip.setPixelColor(0, Color(0, 0, 0, 0))
-        strip.show()
-        time.sleep(period / 2)
-
-    # After flashing, go back to idle state (green + white)
-    led_idle()
+    leds.play(Flash([LED_RED, LED_OFF], [LED_OFF, LED_OFF], period,
+                    duration=duration, then=LED_IDLE))
 
 # Start: idle (green)
 led_idle()
 
 # -----------------------------
-# measure_distance
+# DISTANCE SENSORS
 # -----------------------------
-def measure_distance(trigger_pin, echo_pin):
-    """Measure distance from one HC-SR04 sensor."""
-    # Send 10 µs trigger pulse
-    GPIO.output(trigger_pin, True)
-    time.sleep(0.00001)
-    GPIO.output(trigger_pin, False)
+ULTRASONIC_TIMEOUT = 0.05   # seconds; reading gives up -> NO_ECHO (no hang)
+ULTRASONIC_CROSSTALK = True # both sensors look into the same bin -> stagger them
+
+ultrasonic_sensors = [
+    Ultrasonic(GPIO, clock, TRIG1, ECHO1, timeout=ULTRASONIC_TIMEOUT),
+    Ultrasonic(GPIO, clock, TRIG2, ECHO2, timeout=ULTRASONIC_TIMEOUT),
+]
 
-    start_time = time.time()
-    stop_time = time.time()
+# Every pair of sensors that can hear each other goes in a different time slot
+_crosstalk_pairs = [
+    (a, b)
+    for a in range(len(ultrasonic_sensors))
+    for b in range(a + 1, len(ultrasonic_sensors))
+] if ULTRASONIC_CROSSTALK else []
+ranging = RangingScheduler(clock, ultrasonic_sensors, conflicts=_crosstalk_pairs)
 
-    # Wait for echo to go HIGH
-    while GPIO.input(echo_pin) == 0:
-        start_time = time.time()
+# Background sampling: keep ranging all the time so a button press can decide
+# from readings we already have.
+DISTANCE_SAMPLE_HZ = 10.0   # background readings per second (all sensors)
+DISTANCE_RING_SIZE = 64     # readings kept per sensor
+DISTANCE_WINDOW    = 5      # newest readings used for a decision (median)
+DISTANCE_MAX_AGE   = 0.5    # seconds; older than this -> measure fresh instead
 
-    # Wait for echo to go LOW
-    while GPIO.input(echo_pin) == 1:
-        stop_time = time.time()
+distance_sampler = DistanceSampler(clock, ranging, DISTANCE_SAMPLE_HZ, DISTANCE_RING_SIZE)
 
-    # Time difference
-    time_elapsed = stop_time - start_time
+@traced("measure_all_distances")
+def measure_all_distances():
+    """One reading from every sensor via the crosstalk-aware schedule."""
+    return ranging.measure_all()
 
-    # Distance in cm
-    distance_cm = round((time_elapsed * 34300) / 2, 2)
 
-    return distance_cm
+@traced("recent_distances")
+def recent_distances():
+    """
+    Distances for a decision right now: median of the newest background
+    readings, or one fresh measurement if the sampler has nothing recent.
+    """
+    recent = distance_sampler.recent(DISTANCE_WINDOW, DISTANCE_MAX_AGE)
+    if recent is None:
+        return measure_all_distances()
+    return recent
+
+
+def object_present(d1, d2):
+    """True if either sensor sees something closer than its threshold."""
+    return ((d1 is not NO_ECHO and d1 < S1_DETECT_CM) or
+            (d2 is not NO_ECHO and d2 < S2_DETECT_CM))
 
 # -----------------------------
 # PIR CHECK FUNCTION
 # -----------------------------
+# Rolling PIR history: the safety check reads the last PIR_OBSERVE_TIME
+# seconds that were already observed instead of always waiting 5 s.
+pir_monitor = PirMonitor(clock, pir_input, keep_seconds=2 * PIR_OBSERVE_TIME)
+
+@traced("pir_clear_for_window")
 def pir_clear_for_window():
     """
-    Check PIR for a fixed time window.
+    Check PIR over the last PIR_OBSERVE_TIME seconds.
 
-    We ONLY declare "Person detected" if the PIR input stays HIGH
-    continuously for at least PIR_MIN_MOTION_TIME seconds.
+    We ONLY declare "Person detected" if the PIR input stayed HIGH
+    continuously for at least PIR_MIN_MOTION_TIME seconds in that window.
 
     - Short spikes (e.g., < PIR_MIN_MOTION_TIME) are ignored.
-    - If no sustained motion is found during PIR_OBSERVE_TIME,
-      we treat it as safe (return True).
+    - The answer comes from the rolling PIR history. We only wait when the
+      history doesn't cover a whole window yet (right after startup), or
+      while a HIGH run is still going on: then we watch it until it reaches
+      PIR_MIN_MOTION_TIME (not safe) or goes LOW again (safe).
+    - If no sustained motion is found in the window, it's safe (return True).
     """
     log_and_print(
         f"Checking for sustained motion for up to {PIR_OBSERVE_TIME} seconds "
-        f"(needs {PIR_MIN_MOTION_TIME} seconds continuous HIGH to count)."
+        f"(needs {PIR_MIN_MOTION_TIME} seconds continuous HIGH to count).",
+        StatusEvent.PIR_CHECK_STARTED,
     )
 
-    start = time.time()
-    motion_start = None  # when we first saw HIGH
-
-    while time.time() - start < PIR_OBSERVE_TIME:
-        pir_value = GPIO.input(PIR_PIN)
-
-        if pir_value == GPIO.HIGH:
-            if motion_start is None:
-                # First time we see HIGH – start timing it
-                motion_start = time.time()
-                log_and_print("PIR went HIGH, starting motion timer...")
-            else:
-                # We've been HIGH for a while, check duration
-                if time.time() - motion_start >= PIR_MIN_MOTION_TIME:
-                    log_and_print(
-                        f"Person detected (PIR HIGH for >= {PIR_MIN_MOTION_TIME} seconds). "
-                        "Doors will NOT open."
-                    )
-                    return False
-        else:
-            # Went LOW again before reaching threshold -> treat as noise
-            if motion_start is not None:
-                log_and_print("PIR went LOW again before threshold; ignoring spike.")
-            motion_start = None
-
-        time.sleep(PIR_POLL_INTERVAL)
+    covered_at = pir_monitor.covered_until(PIR_OBSERVE_TIME)
+    if clock.monotonic() < covered_at:
+        log_and_print(
+            f"PIR history too short, watching {covered_at - clock.monotonic():.1f} more seconds..."
+        )
 
-    # If we finish the whole window without sustained HIGH, it's safe
-    log_and_print("No sustained motion detected. Safely opening doors.")
+    watching_run = False
+    while True:
+        now = clock.monotonic()
+        longest, spikes = pir_monitor.longest_high(PIR_OBSERVE_TIME, now)
+        run_start = None
+        if pir_input.level == GPIO.HIGH:
+            run_start = pir_monitor.high_since(default=now)
+
+        if longest >= PIR_MIN_MOTION_TIME or (
+            run_start is not None and now >= run_start + PIR_MIN_MOTION_TIME
+        ):
+            log_and_print(
+                f"Person detected (PIR HIGH for >= {PIR_MIN_MOTION_TIME} seconds). "
+                "Doors will NOT open.",
+                StatusEvent.MOTION_DETECTED,
+            )
+            return False
+        if now >= covered_at:
+            if run_start is None:
+                break
+            if not watching_run:
+                watching_run = True
+                log_and_print(
+                    f"PIR is HIGH right now (for {now - run_start:.1f} s), "
+                    "watching until it goes LOW..."
+                )
+
+        # Sleep until the PIR changes, the window is covered, or the HIGH
+        # run still going on would reach the threshold.
+        deadline = covered_at if now < covered_at else None
+        if run_start is not None:
+            reached_at = run_start + PIR_MIN_MOTION_TIME
+            deadline = reached_at if deadline is None else min(deadline, reached_at)
+        pir_input.wait_change(clock, pir_input.edge_count, timeout=max(0.0, deadline - now))
+
+    if spikes:
+        log_and_print(
+            f"PIR had {spikes} short HIGH spike(s) in the last {PIR_OBSERVE_TIME} seconds "
+            f"(longest {longest:.1f} s); ignoring."
+        )
+
+    # No sustained HIGH in the whole window -> safe
+    log_and_print("No sustained motion detected. Safely opening doors.", StatusEvent.NO_MOTION)
     return True
 
 # -----------------------------
 # MOTOR MOVE FUNCTIONS
 # -----------------------------
+# Both door motors run on the stepper engine's timing thread. Each phase
+# fires at an absolute deadline, and each motor has its own steps + speed.
+stepper_engine = StepperEngine(GPIO, clock, sequence)
+
+def forward_plans(delay=STEP_DELAY, delay2=None):
+    return [
+        MotorMove(M1_FORWARD_PINS, M1_FORWARD_STEPS, delay),
+        MotorMove(M2_FORWARD_PINS, M2_FORWARD_STEPS, delay if delay2 is None else delay2),
+    ]
+
+def backward_plans(delay=STEP_DELAY, delay2=None):
+    return [
+        MotorMove(M1_BACKWARD_PINS, M1_BACKWARD_STEPS, delay),
+        MotorMove(M2_BACKWARD_PINS, M2_BACKWARD_STEPS, delay if delay2 is None else delay2),
+    ]
+
+# Compile both directions once at startup into (pins, values) frame tables;
+# every move after that is one batched GPIO.output per frame.
+stepper_engine.compile(forward_plans())
+stepper_engine.compile(backward_plans())
+
+def _trace_move(name, move):
+    """Tracing on: record the whole move (start -> last step) as one span."""
+    if TRACER.enabled:
+        start = TRACER.timer()
+        move.add_done_callback(lambda _m: TRACER.record(name, start, TRACER.timer()))
+    return move
+
+def start_move_forward(delay=STEP_DELAY, delay2=None):
+    """Start opening the doors (non-blocking). Returns a StepperMove handle."""
+    return _trace_move("doors_forward", stepper_engine.move(forward_plans(delay, delay2)))
+
+def start_move_backward(delay=STEP_DELAY, delay2=None):
+    """Start closing the doors (non-blocking). Returns a StepperMove handle."""
+    return _trace_move("doors_backward", stepper_engine.move(backward_plans(delay, delay2)))
+
+@traced("move_both_forward")
 def move_both_forward(delay=STEP_DELAY):
-    """Move BOTH motors forward at the same time."""
-    total_steps = max(M1_FORWARD_STEPS, M2_FORWARD_STEPS)
-
-    for step in range(total_steps):
-        for phase in sequence:
-            # Motor 1
-            if step < M1_FORWARD_STEPS:
-                for pin, val in zip(M1_FORWARD_PINS, phase):
-                    GPIO.output(pin, val)
-            else:
-                for pin in motor1_pins:
-                    GPIO.output(pin, 0)
-
-            # Motor 2
-            if step < M2_FORWARD_STEPS:
-                for pin, val in zip(M2_FORWARD_PINS, phase):
-                    GPIO.output(pin, val)
-            else:
-                for pin in motor2_pins:
-                    GPIO.output(pin, 0)
-
-            sleep(delay)
-
-    for pin in motor1_pins + motor2_pins:
-        GPIO.output(pin, 0)
+    """Move BOTH motors forward at the same time (waits until done)."""
+    stats = start_move_forward(delay).wait()
+    log_and_print(f"Door move timing (forward): {format_stats(stats)}")
+    return stats
 
+@traced("move_both_backward")
 def move_both_backward(delay=STEP_DELAY):
-    """Move BOTH motors backward at the same time."""
-    total_steps = max(M1_BACKWARD_STEPS, M2_BACKWARD_STEPS)
-
-    for step in range(total_steps):
-        for phase in sequence:
-            # Motor 1
-            if step < M1_BACKWARD_STEPS:
-                for pin, val in zip(M1_BACKWARD_PINS, phase):
-                    GPIO.output(pin, val)
-            else:
-                for pin in motor1_pins:
-                    GPIO.output(pin, 0)
-
-            # Motor 2
-            if step < M2_BACKWARD_STEPS:
-                for pin, val in zip(M2_BACKWARD_PINS, phase):
-                    GPIO.output(pin, val)
-            else:
-                for pin in motor2_pins:
-                    GPIO.output(pin, 0)
-
-            sleep(delay)
-
-    for pin in motor1_pins + motor2_pins:
-        GPIO.output(pin, 0)
-
-log_and_print("System ready. Waiting for button press...")
-log_and_print(f"Current donation count: {donation_count}")
-
-try:
-    while True:
-        # Wait for button press
-        if GPIO.input(BUTTON_PIN) == GPIO.HIGH:
-            log_and_print("Button pressed! Measuring distance once...")
-
-            # Keep LED green while we evaluate (idle = not yet safe)
-            # no leds_all_off() here
-
-            # One measurement from each sensor
-            d1 = measure_distance(TRIG1, ECHO1)
-            sleep(0.05)  # small delay between sensors
-            d2 = measure_distance(TRIG2, ECHO2)
-
-            log_and_print(f"Sensor 1: {d1} cm   |   Sensor 2: {d2} cm")
-
-            # Check thresholds for object presence
-            if (d1 < S1_DETECT_CM) or (d2 < S2_DETECT_CM):
-                log_and_print("Object detected by distance sensors.")
-
-                # ---- PIR SAFETY CHECK ----
-                safe_to_open = pir_clear_for_window()
+    """Move BOTH motors backward at the same time (waits until done)."""
+    stats = start_move_backward(delay).wait()
+    log_and_print(f"Door move timing (backward): {format_stats(stats)}")
+    return stats
 
-                if safe_to_open:
-                    # LEDs: SAFE to donate (solid red)
-                    led_safe()
+log_and_print("System ready. Waiting for button press...", StatusEvent.SYSTEM_READY)
+log_and_print(f"Current donation count: {donation_count}",
+              StatusEvent.DONATION_TOTAL, total=donation_count)
 
-                    # 1) Unlock first
-                    log_and_print("Releasing lock before opening doors...")
-                    lock_release()  # this also moves servo UP
-                    sleep(LOCK_RELEASE_TIME)
-
-                    # 2) Open doors
-                    log_and_print("Motors FORWARD (opening doors)...")
-                    move_both_forward(delay=STEP_DELAY)
+# -----------------------------
+# METRICS (served at /metrics)
+# -----------------------------
+# Per-stage durations + outcome counts, for "how long does a donation take
+# and where does the time go" without reading the terminal.
+STAGE_NAMES = ("ranging", "pir_window", "lock_release", "door_open", "dwell",
+               "door_close", "belt_tail", "relock")
+stage_seconds = REGISTRY.histogram(
+    "donation_stage_seconds", "Duration of each donation cycle stage.",
+    label="stage", values=STAGE_NAMES,
+)
+cycle_seconds = REGISTRY.histogram(
+    "donation_cycle_seconds", "Button press to end of cycle, by outcome.",
+    label="outcome", values=(OUTCOME_DONATED, OUTCOME_MOTION_BLOCKED, OUTCOME_NO_OBJECT),
+)
+cycle_outcomes = REGISTRY.counter(
+    "donation_cycles_total", "Finished button cycles, by outcome.",
+    label="outcome", values=(OUTCOME_DONATED, OUTCOME_MOTION_BLOCKED, OUTCOME_NO_OBJECT),
+)
 
-                    # 3) Start belt as soon as doors are open
-                    log_and_print("Doors open. Starting conveyor belt...")
-                    GPIO.output(BELT_PIN, GPIO.HIGH)
-                    belt_start = time.time()
+donor_wait_seconds = REGISTRY.histogram(
+    "donor_wait_seconds", "Button press to the start of its cycle (admission queue wait).",
+)
+REGISTRY.gauge(
+    "donor_queue_depth", "Donors waiting for a cycle (not counting the one being served).",
+    lambda: admission.depth,
+)
+REGISTRY.gauge(
+    "donor_presses_total", "Button presses, by what the admission queue did with them.",
+    lambda: {k: v for k, v in admission.stats().items() if k in ("admitted", "coalesced", "dropped")},
+    label="result", kind="counter",
+)
 
-                    # 4) Keep doors open for DOOR_OPEN_DELAY seconds
-                    log_and_print(f"Keeping doors open for {DOOR_OPEN_DELAY} seconds...")
-                    sleep(DOOR_OPEN_DELAY)
+def _record_stage_metrics(report):
+    """Turn one CycleReport into the per-stage histograms."""
+    t = report.timings
+    stage_seconds.observe(t["lock_settle"].end - t["unlock"].start, "lock_release")
+    stage_seconds.observe(t["open_doors"].end - t["open_doors"].start, "door_open")
+    stage_seconds.observe(t["dwell"].end - t["dwell"].start, "dwell")
+    stage_seconds.observe(t["close_doors"].end - t["close_doors"].start, "door_close")
+    # belt keeps running after the doors closed until BELT_RUN_TIME is up
+    stage_seconds.observe(max(0.0, t["belt_off"].end - t["close_doors"].end), "belt_tail")
+
+# -----------------------------
+# DONATION CYCLE (stage graph)
+# -----------------------------
+# Each stage lists what must be finished first (after=) and what it needs
+# exclusively (resources=). Safety rules live in those constraints:
+#   - doors only open after the lock has been released for LOCK_RELEASE_TIME
+#   - doors only close after DOOR_OPEN_DELAY, and only one door move at a time
+#   - belt stops after BELT_RUN_TIME AND after the doors are closed
+#   - lock only re-engages after the doors are closed
+# Everything else overlaps: LED + servo during the solenoid release, belt
+# tail during relocking.
+def _stage_unlock():
+    log_and_print("Releasing lock before opening doors...")
+    solenoids_release()
+
+def _stage_servo_up():
+    move = set_servo_angle(180)  # servo up = unlocked
+    log_and_print("Lock released (door unlocked). Servo up.", StatusEvent.LOCK_RELEASED)
+    return move
+
+def _stage_relock():
+    started = clock.monotonic()
+    move = lock_engage()   # servo goes down in the background
+    # relock time = until the servo has settled (measured, not waited for;
+    # skipped if the next cycle moved the servo before it settled)
+    def record(m):
+        if not m.superseded:
+            stage_seconds.observe(clock.monotonic() - started, "relock")
+    move.add_done_callback(record)
+
+def _log_move_timing(direction):
+    def log(move):
+        if move.error is not None:
+            log_and_print(f"Door move FAILED ({direction}): {move.error}")
+        else:
+            log_and_print(f"Door move timing ({direction}): {format_stats(move.stats)}")
+    return log
+
+def _stage_open_doors():
+    log_and_print("Motors FORWARD (opening doors)...", StatusEvent.DOORS_OPENING)
+    move = start_move_forward(delay=STEP_DELAY)
+    move.add_done_callback(_log_move_timing("forward"))
+    return move
+
+def _stage_belt_on():
+    log_and_print("Doors open. Starting conveyor belt...", StatusEvent.BELT_STARTED)
+    GPIO.output(BELT_PIN, GPIO.HIGH)
+
+def _stage_dwell():
+    log_and_print(f"Keeping doors open for {DOOR_OPEN_DELAY} seconds...")
+    return DOOR_OPEN_DELAY
+
+def _stage_close_doors():
+    log_and_print("Motors BACKWARD (closing doors)...", StatusEvent.DOORS_CLOSING)
+    move = start_move_backward(delay=STEP_DELAY)
+    move.add_done_callback(_log_move_timing("backward"))
+    return move
+
+def _stage_belt_off():
+    GPIO.output(BELT_PIN, GPIO.LOW)
+    log_and_print("Conveyor belt stopped.", StatusEvent.BELT_STOPPED)
 
-                    # 5) Close doors
-                    log_and_print("Motors BACKWARD (closing doors)...")
-                    move_both_backward(delay=STEP_DELAY)
+def _stage_count():
+    global donation_count
 
-                    # 6) Ensure belt runs for BELT_RUN_TIME total
-                    elapsed = time.time() - belt_start
-                    remaining = max(0.0, BELT_RUN_TIME - elapsed)
-                    if remaining > 0:
-                        sleep(remaining)
+    # ✅ Count donation here
+    donation_count += 1
+    log_and_print(f"Donation counted! Total donations: {donation_count}\n",
+                  StatusEvent.DONATION_COUNTED, total=donation_count)
 
-                    GPIO.output(BELT_PIN, GPIO.LOW)
-                    log_and_print("Conveyor belt stopped.")
+    # Back to idle: green
+    led_idle()
 
-                    # 7) Re-engage lock AFTER motion
-                    lock_engage()   # this also moves servo DOWN
+DONATION_CYCLE = [
+    Stage("led_safe", led_safe),                      # LEDs: SAFE to donate (solid red)
+    Stage("unlock", _stage_unlock, resources=["lock"]),
+    Stage("lock_settle", lambda: LOCK_RELEASE_TIME, after=["unlock"]),
+    Stage("servo_up", _stage_servo_up, after=["unlock"], resources=["servo"]),
+    Stage("open_doors", _stage_open_doors, after=["lock_settle"], resources=["doors"]),
+    Stage("belt_on", _stage_belt_on, after=["open_doors"]),
+    Stage("belt_run", lambda: BELT_RUN_TIME, after=["belt_on"]),
+    Stage("dwell", _stage_dwell, after=["open_doors"]),
+    Stage("close_doors", _stage_close_doors, after=["dwell"], resources=["doors"]),
+    Stage("belt_off", _stage_belt_off, after=["belt_run", "close_doors"]),
+    Stage("relock", _stage_relock, after=["close_doors", "servo_up"], resources=["lock", "servo"]),
+    Stage("count", _stage_count, after=["relock", "belt_off"]),
+]
+validate(DONATION_CYCLE)
 
-                    # ✅ Count donation here
-                    donation_count += 1
-                    log_and_print(f"Donation counted! Total donations: {donation_count}\n")
+cycle_scheduler = CycleScheduler(clock)
 
-                    # Back to idle: green
-                    led_idle()
+def run_donation_cycle():
+    """Run the door/belt/lock stages and log where the time went."""
+    try:
+        report = cycle_scheduler.run(DONATION_CYCLE)
+    except Exception as e:
+        # A stage failed: don't count it; the caller's shutdown() makes the box safe
+        log_and_print(f"Donation cycle stopped: {e}")
+        raise
+    _record_stage_metrics(report)
+    log_and_print(f"Cycle timing: {report.describe()}")
+    return report
 
-                else:
-                    # Motion detected -> do NOT open doors or run belt
-                    log_and_print("Doors remain closed for safety. Conveyor stays off. Lock stays engaged.")
-                    log_and_print(f"Total donations so far: {donation_count}\n")
+# -----------------------------
+# ONE DONATION CYCLE (button handler)
+# -----------------------------
+@traced("handle_button_press")
+def handle_button_press():
+    """
+    Run one full cycle: measure, PIR safety check, doors/belt/lock, LEDs.
+    Returns the outcome (OUTCOME_*), which is also written to the ledger.
+    """
+    started_at = clock.time()
+    cycle_start = clock.monotonic()
+    log_and_print("Button pressed! Measuring distance once...", StatusEvent.BUTTON_PRESSED)
 
-                    # LEDs: NOT safe to donate (flashing red, then back to green)
-                    led_not_safe_flash()
+    # Keep LED green while we evaluate (idle = not yet safe)
+    # no leds_all_off() here
 
-            else:
-                log_and_print("No object detected. Motors, conveyor, and lock state unchanged.")
-                log_and_print(f"Total donations so far: {donation_count}\n")
+    # Decide from the background sampler's recent window (no ranging on the
+    # critical path unless the sampler has nothing fresh)
+    d1, d2 = recent_distances()
+    stage_seconds.observe(clock.monotonic() - cycle_start, "ranging")
 
-                # No object -> idle (green)
-                led_idle()
+    log_and_print(f"Sensor 1: {format_distance(d1)}   |   Sensor 2: {format_distance(d2)}",
+                  StatusEvent.SENSOR_READING, d1=d1, d2=d2)
 
-            # Wait for button release so it doesn't retrigger
-            while GPIO.input(BUTTON_PIN) == GPIO.HIGH:
-                sleep(0.05)
+    # Check thresholds for object presence (NO_ECHO never counts as an object)
+    if object_present(d1, d2):
+        log_and_print("Object detected by distance sensors.", StatusEvent.OBJECT_DETECTED)
 
-        sleep(0.05)
+        # ---- PIR SAFETY CHECK ----
+        pir_start = clock.monotonic()
+        safe_to_open = pir_clear_for_window()
+        stage_seconds.observe(clock.monotonic() - pir_start, "pir_window")
 
-except KeyboardInterrupt:
-    log_and_print("\nStopped by user")
+        if safe_to_open:
+            # Doors / belt / lock as an overlapped stage graph
+            run_donation_cycle()
+            outcome = OUTCOME_DONATED
 
-finally:
-    # Make sure everything is in a safe state
+        else:
+            # Motion detected -> do NOT open doors or run belt
+            log_and_print("Doors remain closed for safety. Conveyor stays off. Lock stays engaged.",
+                          StatusEvent.DOORS_STAY_CLOSED)
+            log_and_print(f"Total donations so far: {donation_count}\n",
+                          StatusEvent.DONATION_TOTAL, total=donation_count)
+
+            # LEDs: NOT safe to donate (flashing red, then back to green)
+            led_not_safe_flash()
+            outcome = OUTCOME_MOTION_BLOCKED
+
+    else:
+        log_and_print("No object detected. Motors, conveyor, and lock state unchanged.",
+                      StatusEvent.NO_OBJECT)
+        log_and_print(f"Total donations so far: {donation_count}\n",
+                      StatusEvent.DONATION_TOTAL, total=donation_count)
+
+        # No object -> idle (green)
+        led_idle()
+        outcome = OUTCOME_NO_OBJECT
+
+    cycle_seconds.observe(clock.monotonic() - cycle_start, outcome)
+    cycle_outcomes.inc(outcome)
+
+    # Persisted by the ledger's writer thread; never waits on the SD card
+    ledger.record(outcome, started_at, clock.time(), d1, d2)
+    return outcome
+
+
+def shutdown():
+    """Make sure everything is in a safe state."""
+    distance_sampler.stop()
+    stepper_engine.stop()
     GPIO.output(BELT_PIN, GPIO.LOW)
     lock_engage()        # lock + servo down on exit
-    servo_pwm.stop()     # stop servo PWM
+    servo.stop()         # let the servo reach 0° before...
+    servo_pwm.stop()     # ...stopping servo PWM
 
     # Turn LEDs off on exit
-    led_all_off()
+    leds.stop(final=LED_ALL_OFF)
 
+    inputs.close()
+    for sensor in ultrasonic_sensors:
+        sensor.close()
     GPIO.cleanup()
+    ledger.close()       # flush cycles still waiting to be written
+    stop_web_server()
     log_and_print("GPIO cleaned up.")
+    flush_logs()         # print everything still queued before we exit
+
+
+WEB_READY_TIMEOUT = 2.0   # seconds to wait for the status page at startup
+
+
+def main():
+    # Status website in the background (safe to call again; one server only)
+    web = start_web_server()
+    distance_sampler.start()
+    if web.wait_ready(WEB_READY_TIMEOUT):
+        log_and_print(f"Status page ready on port {web.port}.")
+    else:
+        log_and_print(f"Status page NOT available: {web.error}")
+
+    try:
+        while True:
+            # Sleep until a donor is waiting (presses are queued by the
+            # button's edge callback, also while a cycle is running)
+            request = admission.next()
+            donor_wait_seconds.observe(request.wait)
+            if request.wait > 0.5:
+                log_and_print(
+                    f"Next donor waited {request.wait:.1f} seconds "
+                    f"({admission.depth} more in queue)."
+                )
+            try:
+                handle_button_press()
+            finally:
+                admission.finished(request)
+
+    except KeyboardInterrupt:
+        log_and_print("\nStopped by user")
+
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
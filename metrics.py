@@ -0,0 +1,156 @@
+# metrics.py
+# Low-overhead counters and fixed-bucket histograms, exported in Prometheus text format
+#
+# How it works:
+# - main.py creates its instruments once from REGISTRY:
+#       STAGE_SECONDS = REGISTRY.histogram("donation_stage_seconds", "...", label="stage")
+#   and records with STAGE_SECONDS.observe(seconds, "door_open").
+# - A histogram keeps a fixed list of bucket upper bounds; observe() is one
+#   bisect + a few integer adds under a lock. Nothing grows per observation.
+# - Counters are plain integers per label value.
+# - Gauges hold no data of their own: they call a function when /metrics is
+#   rendered (e.g. the donor queue depth), so there is nothing to keep in sync.
+# - The web server's /metrics calls REGISTRY.render(), which prints every
+#   instrument in the Prometheus text exposition format (cumulative buckets,
+#   _sum, _count).
+
+import bisect
+import threading
+
+# seconds; covers quick GPIO stages up to the multi-second door moves / dwell
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(label, value, extra=""):
+    parts = []
+    if label is not None:
+        parts.append(f'{label}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label value."""
+
+    def __init__(self, name, help_text, label=None, values=()):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        self._counts = {v: 0 for v in values}    # pre-listed values show up as 0
+
+    def inc(self, value=None, amount=1):
+        with self._lock:
+            self._counts[value] = self._counts.get(value, 0) + amount
+
+    def get(self, value=None):
+        return self._counts.get(value, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._counts.items())
+        for value, count in items:
+            lines.append(f"{self.name}{_labels(self.label, value)} {count}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram per label value."""
+
+    def __init__(self, name, help_text, buckets=STAGE_BUCKETS, label=None, values=()):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.bounds = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}                # value -> [bucket counts..., +Inf count], sum
+        for value in values:
+            self._series_for(value)
+
+    def _series_for(self, value):
+        series = self._series.get(value)
+        if series is None:
+            series = self._series[value] = [[0] * (len(self.bounds) + 1), 0.0]
+        return series
+
+    def observe(self, seconds, value=None):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            series = self._series_for(value)
+            series[0][index] += 1
+            series[1] += seconds
+
+    def count(self, value=None):
+        series = self._series.get(value)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(v, list(s[0]), s[1]) for v, s in self._series.items()]
+        for value, counts, total in items:
+            cumulative = 0
+            for bound, n in zip(self.bounds, counts):
+                cumulative += n
+                le = _labels(self.label, value, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            inf = _labels(self.label, value, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, value)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label, value)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from `read()` at render time; a dict of label value -> number if `label` is set."""
+
+    def __init__(self, name, help_text, read, label=None, kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.label = label
+        self.kind = kind                 # "counter" for totals kept elsewhere
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.read()
+        items = value.items() if self.label is not None else [(None, value)]
+        for label_value, number in items:
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {_number(number)}")
+        return lines
+
+
+class Registry:
+    """All instruments the /metrics endpoint exports."""
+
+    def __init__(self):
+        self._instruments = []
+
+    def counter(self, name, help_text, label=None, values=()):
+        return self._add(Counter(name, help_text, label, values))
+
+    def histogram(self, name, help_text, buckets=STAGE_BUCKETS, label=None, values=()):
+        return self._add(Histogram(name, help_text, buckets, label, values))
+
+    def gauge(self, name, help_text, read, label=None, kind="gauge"):
+        return self._add(Gauge(name, help_text, read, label, kind))
+
+    def _add(self, instrument):
+        self._instruments.append(instrument)
+        return instrument
+
+    def render(self):
+        lines = []
+        for instrument in self._instruments:
+            lines.extend(instrument.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,80 @@
+# pir_monitor.py
+# Rolling PIR history so the safety check can answer from the past
+#
+# How it works:
+# - PirMonitor listens to the PIR's edge-triggered input and records every
+#   HIGH/LOW transition with its monotonic timestamp in a deque.
+# - The safety question "was the PIR HIGH continuously for >= min_high seconds
+#   during the last `window` seconds?" is answered from that history.
+# - Only right after startup, when the history doesn't cover a whole window
+#   yet, does the caller still have to wait for the rest of it.
+# - A HIGH run still going on at decision time isn't finished yet:
+#   high_since() gives its start, so the caller can watch it until it either
+#   reaches the threshold or ends.
+
+import collections
+import threading
+
+
+class PirMonitor:
+    """Timestamped HIGH/LOW transition history for one PIR input."""
+
+    def __init__(self, clock, pir_input, keep_seconds):
+        self.clock = clock
+        self.keep_seconds = keep_seconds
+        self._lock = threading.Lock()
+        self.started_at = clock.monotonic()
+        # (timestamp, level); the first entry is the level when we started
+        self.history = collections.deque([(self.started_at, pir_input.level)])
+        pir_input.add_listener(self._on_edge)
+
+    def _on_edge(self, level, timestamp):
+        with self._lock:
+            self.history.append((timestamp, level))
+            self._prune(timestamp)
+
+    def _prune(self, now):
+        # keep the newest transition before the cutoff: it gives the level there
+        cutoff = now - self.keep_seconds
+        while len(self.history) > 1 and self.history[1][0] <= cutoff:
+            self.history.popleft()
+
+    def covered_until(self, window):
+        """Earliest time at which the history covers a whole `window`."""
+        return self.started_at + window
+
+    def high_since(self, default=None):
+        """Start of the HIGH run still going on now; `default` if the PIR is LOW."""
+        with self._lock:
+            ts, level = self.history[-1]
+        return ts if level else default
+
+    def high_runs(self, start, end):
+        """
+        HIGH intervals clipped to [start, end], as (run_start, run_end).
+        An interval still HIGH at `end` is cut off at `end`.
+        """
+        with self._lock:
+            transitions = list(self.history)
+
+        runs = []
+        run_start = None
+        for ts, level in transitions:
+            ts = max(ts, start)
+            if ts > end:
+                break
+            if level and run_start is None:
+                run_start = ts
+            elif not level and run_start is not None:
+                if ts > start:
+                    runs.append((run_start, ts))
+                run_start = None
+        if run_start is not None:
+            runs.append((run_start, end))
+        return runs
+
+    def longest_high(self, window, now=None):
+        """Longest continuous HIGH time within the last `window` seconds."""
+        now = self.clock.monotonic() if now is None else now
+        runs = self.high_runs(now - window, now)
+        return max((b - a for a, b in runs), default=0.0), len(runs)
@@ -0,0 +1,294 @@
+# ranging.py
+# HC-SR04 ranging without busy-spinning
+#
+# How it works:
+# - The echo pin has GPIO edge detection on it. After a trigger pulse, the
+#   first edge is the echo going HIGH and the second is it going LOW; each is
+#   timestamped with perf_counter() inside the GPIO callback. Edges are taken
+#   in order, not by re-reading the pin: a callback that runs late (after a
+#   short echo already ended) must still count as the rise.
+# - If the echo is still HIGH when a reading should start (an earlier echo
+#   that timed out hasn't ended yet), that reading is skipped and returns
+#   NO_ECHO - so that echo's late falling edge can't pass as the next rise.
+# - measure() just waits on an Event for the falling edge, so the CPU is idle
+#   while the sound is in flight.
+# - Every reading has a hard timeout. If the echo never shows up (or never
+#   ends) measure() returns NO_ECHO instead of hanging the control loop.
+# - RangingScheduler measures several sensors in one call. Sensors that can't
+#   hear each other fire at the same time; sensors that can (crosstalk) are
+#   put in different time slots, each slot long enough for the previous ping
+#   to die out.
+# - DistanceSampler keeps ranging in the background at a fixed rate and
+#   stores every reading in a DistanceRing (fixed-size array('d') ring
+#   buffer), so the button handler can decide from recent readings right
+#   away instead of measuring on the critical path. On the simulated
+#   (virtual) clock it has no thread: each sample is a background
+#   clock.call_at(), skipped if the control path is ranging right then.
+
+import math
+import statistics
+import threading
+from array import array
+
+SPEED_OF_SOUND_CM_S = 34300
+
+NO_ECHO = None          # result of a reading that timed out
+ECHO_TIMEOUT = 0.05     # seconds; the HC-SR04 gives up on its own after ~38 ms
+TRIGGER_PULSE = 0.00001 # 10 µs trigger pulse
+
+MAX_RANGE_CM = 100.0    # farthest echo that could still confuse another sensor
+CROSSTALK_GUARD = 0.002 # extra quiet time between crosstalking slots (seconds)
+
+
+class Ultrasonic:
+    """One HC-SR04 sensor (trigger + echo pin) measured by echo edge timestamps."""
+
+    def __init__(self, gpio, clock, trig_pin, echo_pin, timeout=ECHO_TIMEOUT):
+        self.gpio = gpio
+        self.clock = clock
+        self.trig_pin = trig_pin
+        self.echo_pin = echo_pin
+        self.timeout = timeout
+        self.timeouts = 0            # how many readings came back NO_ECHO
+        self.busy = 0                # readings skipped: echo still HIGH at trigger time
+        self.triggered_at = None
+
+        self._armed = False
+        self._skipped = False
+        self._rise = None
+        self._fall = None
+        self._done = threading.Event()
+        gpio.add_event_detect(echo_pin, gpio.BOTH, callback=self._on_echo_edge)
+
+    def _on_echo_edge(self, channel):
+        ts = self.clock.perf_counter()
+        if not self._armed:
+            return                   # stray/late edge from an earlier reading
+        if self._rise is None:
+            self._rise = ts
+        else:
+            self._fall = ts
+            self._armed = False
+            self._done.set()
+
+    def trigger(self):
+        """Arm the edge capture and send the 10 µs trigger pulse."""
+        self._rise = None
+        self._fall = None
+        self._done.clear()
+        self._skipped = bool(self.gpio.input(self.echo_pin))
+        if self._skipped:
+            # previous echo still running: this reading can't be timed
+            self._armed = False
+            self.triggered_at = self.clock.monotonic()
+            self.busy += 1
+            return
+        self._armed = True
+        self.triggered_at = self.clock.monotonic()
+        self.gpio.output(self.trig_pin, True)
+        self.clock.sleep(TRIGGER_PULSE)
+        self.gpio.output(self.trig_pin, False)
+
+    def collect(self):
+        """Wait for the echo started by trigger(); distance in cm or NO_ECHO."""
+        if self._skipped:
+            return NO_ECHO
+        remaining = self.triggered_at + self.timeout - self.clock.monotonic()
+        if not self.clock.wait(self._done, max(0.0, remaining)):
+            self._armed = False
+            self.timeouts += 1
+            return NO_ECHO
+        return round(((self._fall - self._rise) * SPEED_OF_SOUND_CM_S) / 2, 2)
+
+    def measure(self):
+        """One reading: trigger + collect."""
+        self.trigger()
+        return self.collect()
+
+    def close(self):
+        self.gpio.remove_event_detect(self.echo_pin)
+
+
+class RangingScheduler:
+    """
+    Measure several Ultrasonic sensors in one call.
+
+    conflicts = pairs of sensor indexes that can hear each other's pings.
+    Sensors are greedily packed into slots so no two conflicting sensors
+    share a slot; each slot fires all its sensors together.
+    """
+
+    def __init__(self, clock, sensors, conflicts=(), max_range_cm=MAX_RANGE_CM,
+                 guard=CROSSTALK_GUARD):
+        self.clock = clock
+        self.sensors = list(sensors)
+        self.slots = build_slots(len(self.sensors), conflicts)
+        # a ping is harmless once it has travelled to max range and back
+        self.slot_time = 2.0 * max_range_cm / SPEED_OF_SOUND_CM_S + guard
+        self._quiet_at = 0.0     # earliest time the next slot may fire
+        self._lock = threading.Lock()   # sampler thread + control thread share sensors
+
+    def measure_all(self, blocking=True):
+        """
+        One reading from every sensor, in sensor order (NO_ECHO on timeout).
+        With blocking=False, returns None instead of waiting if a measurement
+        is already running.
+        """
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            return self._measure_all()
+        finally:
+            self._lock.release()
+
+    def _measure_all(self):
+        results = [NO_ECHO] * len(self.sensors)
+        for slot in self.slots:
+            wait = self._quiet_at - self.clock.monotonic()
+            if wait > 0:
+                self.clock.sleep(wait)
+
+            start = self.clock.monotonic()
+            for i in slot:
+                self.sensors[i].trigger()
+            for i in slot:
+                results[i] = self.sensors[i].collect()
+            self._quiet_at = start + self.slot_time
+        return results
+
+
+class DistanceRing:
+    """
+    Fixed-size ring of recent readings: one array('d') of timestamps plus
+    one array('d') per sensor. NO_ECHO is stored as NaN.
+    """
+
+    def __init__(self, sensor_count, capacity):
+        self.capacity = capacity
+        self.times = array("d", [0.0] * capacity)
+        self.values = [array("d", [math.nan] * capacity) for _ in range(sensor_count)]
+        self.count = 0               # total readings ever written
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, readings):
+        with self._lock:
+            i = self.count % self.capacity
+            self.times[i] = timestamp
+            for column, value in zip(self.values, readings):
+                column[i] = math.nan if value is NO_ECHO else value
+            self.count += 1
+
+    def latest_time(self):
+        """Timestamp of the newest reading (None if empty)."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            return self.times[(self.count - 1) % self.capacity]
+
+    def window(self, n):
+        """Newest n readings per sensor (oldest first), as lists of floats."""
+        with self._lock:
+            n = min(n, self.count, self.capacity)
+            idx = [(self.count - n + k) % self.capacity for k in range(n)]
+            return [[column[i] for i in idx] for column in self.values]
+
+
+def window_median(values):
+    """Median of the valid readings in a window (NO_ECHO if none came back)."""
+    valid = [v for v in values if not math.isnan(v)]
+    return statistics.median(valid) if valid else NO_ECHO
+
+
+class DistanceSampler:
+    """Background thread: ranging.measure_all() every 1/rate_hz seconds into a ring."""
+
+    def __init__(self, clock, scheduler, rate_hz, capacity):
+        self.clock = clock
+        self.scheduler = scheduler
+        self.period = 1.0 / rate_hz
+        self.ring = DistanceRing(len(scheduler.sensors), capacity)
+        self._stop = threading.Event()
+        self._thread = None
+        self._generation = 0             # sim: invalidates stale sample callbacks
+        self._sim_running = False
+
+    def sample_once(self, blocking=True):
+        readings = self.scheduler.measure_all(blocking)
+        if readings is not None:
+            self.ring.append(self.clock.monotonic(), readings)
+        return readings
+
+    def start(self):
+        if self.clock.virtual:
+            if not self._sim_running:
+                self._sim_running = True
+                self._sim_tick(self._generation, self.clock.monotonic())
+            return
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="distance-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.clock.virtual:
+            self._sim_running = False
+            self._generation += 1
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        # Deadline-based so sampling time doesn't stretch the period
+        next_at = self.clock.monotonic()
+        while not self._stop.is_set():
+            self.sample_once()
+            next_at += self.period
+            wait = next_at - self.clock.monotonic()
+            if wait < 0:
+                next_at = self.clock.monotonic()   # fell behind; don't burst
+            elif self.clock.wait(self._stop, wait):
+                break
+
+    def _sim_tick(self, generation, due):
+        if generation != self._generation:
+            return                       # stopped (or restarted) since
+        # runs inside whoever moves the clock: skip if they are ranging now
+        self.sample_once(blocking=False)
+        next_at = max(due + self.period, self.clock.monotonic())
+        self.clock.call_at(next_at, lambda: self._sim_tick(generation, next_at), background=True)
+
+    def recent(self, window, max_age):
+        """
+        Per-sensor median of the newest `window` readings, or None if the
+        ring has nothing newer than max_age seconds (sampler not running).
+        """
+        latest = self.ring.latest_time()
+        if latest is None or self.clock.monotonic() - latest > max_age:
+            return None
+        return [window_median(values) for values in self.ring.window(window)]
+
+
+def build_slots(count, conflicts):
+    """Greedy graph colouring: list of slots, each a list of sensor indexes."""
+    neighbours = {i: set() for i in range(count)}
+    for a, b in conflicts:
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    slots = []
+    for i in range(count):
+        for slot in slots:
+            if not neighbours[i].intersection(slot):
+                slot.append(i)
+                break
+        else:
+            slots.append([i])
+    return slots
+
+
+def format_distance(distance_cm):
+    """Distance for log lines ("no echo" for timed-out readings)."""
+    return "no echo" if distance_cm is NO_ECHO else f"{distance_cm} cm"
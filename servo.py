@@ -0,0 +1,158 @@
+# servo.py
+# Servo lock indicator that moves in the background
+#
+# How it works:
+# - ServoController.move(angle) sets the PWM duty cycle right away and returns
+#   a ServoMove (a small future). The 0.3 s settle time and the "stop sending
+#   pulses" (duty 0) happen on the controller's worker thread.
+# - The last commanded angle is remembered; moving to the same angle again
+#   is skipped and returns an already-finished ServoMove.
+# - A newer move() replaces an unfinished one: the old ServoMove completes
+#   (superseded=True) and the servo heads straight for the new angle.
+# - Callers that really have to wait use ServoMove.wait().
+# - On the simulated (virtual) clock the duty-0 step is a clock.call_at()
+#   callback instead of a thread.
+
+import collections
+import threading
+
+SETTLE_TIME = 0.3       # seconds the servo gets to reach its angle
+
+
+def angle_to_duty(angle):
+    """0°->~2%, 180°->~12% duty at 50 Hz."""
+    return 2 + (angle / 18.0)
+
+
+class ServoMove:
+    """Completion handle for one servo move."""
+
+    def __init__(self, clock, angle):
+        self.clock = clock
+        self.angle = angle
+        self.superseded = False
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the servo settled (True) or timeout (False)."""
+        return self.clock.wait(self._done, timeout)
+
+    def add_done_callback(self, fn):
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, superseded=False):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.superseded = superseded
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class ServoController:
+    """Owns the servo PWM channel; moves happen off the caller's thread."""
+
+    def __init__(self, pwm, clock, settle=SETTLE_TIME):
+        self.pwm = pwm
+        self.clock = clock
+        self.settle = settle
+        self.angle = None                # last commanded angle (None = unknown)
+        self.moves = 0                   # moves actually sent to the servo
+        self.skipped = 0                 # redundant moves skipped
+        self._current = None             # ServoMove still settling
+        self._pending = collections.deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def move(self, angle):
+        """Start moving to `angle`; returns a ServoMove."""
+        with self._lock:
+            if angle == self.angle:
+                self.skipped += 1
+                # still settling toward this same angle -> same handle
+                if self._current is not None and not self._current.done():
+                    return self._current
+                handle = ServoMove(self.clock, angle)
+                handle._finish()
+                return handle
+
+            handle = ServoMove(self.clock, angle)
+            self.angle = angle
+            self.moves += 1
+            previous, self._current = self._current, handle
+            self.pwm.ChangeDutyCycle(angle_to_duty(angle))
+
+        if previous is not None:
+            previous._finish(superseded=True)
+
+        if self.clock.virtual:
+            self.clock.call_later(self.settle, lambda: self._release(handle))
+        else:
+            self._pending.append((self.clock.monotonic() + self.settle, handle))
+            self._ensure_thread()
+            self._wake.set()
+        return handle
+
+    def stop(self):
+        """Finish any move in progress, then stop the worker thread."""
+        with self._lock:
+            current = self._current
+        if current is not None:
+            current.wait(self.settle * 2)
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        if thread is not None:
+            self._wake.set()
+            thread.join(timeout=1.0)
+        self._stopping = False
+
+    def _release(self, handle):
+        """Settle time is over: stop the pulses unless a newer move took over."""
+        with self._lock:
+            if self._current is not handle:
+                return
+            self.pwm.ChangeDutyCycle(0)
+            self._current = None
+        handle._finish()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="servo", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        waiting = collections.deque()
+        while True:
+            self._wake.clear()
+            while self._pending:
+                waiting.append(self._pending.popleft())
+            # only the newest move still matters; older ones were superseded
+            while len(waiting) > 1:
+                waiting.popleft()
+            if self._stopping and not waiting:
+                return
+
+            timeout = None
+            if waiting:
+                deadline, handle = waiting[0]
+                timeout = deadline - self.clock.monotonic()
+                if timeout <= 0:
+                    waiting.popleft()
+                    self._release(handle)
+                    continue
+            self.clock.wait(self._wake, timeout)
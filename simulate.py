@@ -0,0 +1,80 @@
+# simulate.py
+# Run donation cycles on the simulated hardware backend (no Pi needed).
+#
+# Examples:
+#   python3 simulate.py                      # one donation, object at 12 cm
+#   python3 simulate.py --cycles 20 --profile
+#   python3 simulate.py --distance 50        # nothing in the box
+#   python3 simulate.py --trace trace.json   # spans for ui.perfetto.dev
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import time
+
+import hardware
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulated donation cycles")
+    parser.add_argument("--cycles", type=int, default=1, help="number of button presses")
+    parser.add_argument("--distance", type=float, default=12.0,
+                        help="object distance seen by both sensors (cm)")
+    parser.add_argument("--profile", action="store_true", help="print a cProfile summary")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace (virtual-clock spans) to FILE")
+    return parser
+
+
+def setup_sim(distance_cm=12.0):
+    """Select the sim backend, import main.py and wire up the fake sensors."""
+    hw = hardware.use_backend("sim")
+    # keep simulated cycles out of the real donation ledger
+    os.environ.setdefault("DONATION_LEDGER", os.path.join(tempfile.mkdtemp(), "sim_donations.db"))
+    import main
+
+    hw.GPIO.attach_ultrasonic(main.TRIG1, main.ECHO1, distance_cm)
+    hw.GPIO.attach_ultrasonic(main.TRIG2, main.ECHO2, distance_cm)
+    return hw, main
+
+
+def run(args):
+    hw, main = setup_sim(args.distance)
+    if args.trace:
+        main.TRACER.enable()
+
+    profiler = cProfile.Profile() if args.profile else None
+    virtual_start = hw.clock.monotonic()
+    real_start = time.perf_counter()
+
+    if profiler:
+        profiler.enable()
+    for _ in range(args.cycles):
+        main.handle_button_press()
+    if profiler:
+        profiler.disable()
+
+    real = time.perf_counter() - real_start
+    main.flush_logs()
+    virtual = hw.clock.monotonic() - virtual_start
+    print()
+    print(f"cycles:        {args.cycles}")
+    print(f"donations:     {main.donation_count}")
+    print(f"virtual time:  {virtual:.3f} s ({virtual / args.cycles:.3f} s per cycle)")
+    print(f"real time:     {real * 1000:.1f} ms ({real * 1000 / args.cycles:.2f} ms per cycle)")
+    print(f"GPIO writes:   {hw.GPIO.writes}   reads: {hw.GPIO.reads}")
+
+    if args.trace:
+        with open(args.trace, "w") as f:
+            json.dump(main.TRACER.chrome_trace(), f)
+        print(f"trace:         {args.trace}")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
@@ -0,0 +1,59 @@
+// No full-page reloads (no flashing).
+// The server pushes every status change over /status_stream (SSE) and we
+// update only the text. If the stream drops we poll /status_json every
+// second until it is back: the browser reconnects by itself, and if it
+// gives up on the stream we open a new one every 10 seconds ourselves.
+document.addEventListener("DOMContentLoaded", function() {
+  const STREAM_RETRY_MS = 10000;
+  let pollTimer = null;
+
+  function showStatus(data) {
+    document.getElementById("status-text").textContent = data.user_message;
+    document.getElementById("header-text").textContent = data.header_text;
+    document.getElementById("donation-total").textContent = data.donation_total;
+  }
+
+  async function refreshStatus() {
+    try {
+      const res = await fetch("/status_json");
+      if (!res.ok) return;
+      showStatus(await res.json());
+    } catch (e) {
+      // ignore errors silently
+    }
+  }
+
+  function startPolling() {
+    if (pollTimer === null) {
+      refreshStatus();
+      pollTimer = setInterval(refreshStatus, 1000);
+    }
+  }
+
+  function stopPolling() {
+    if (pollTimer !== null) {
+      clearInterval(pollTimer);
+      pollTimer = null;
+    }
+  }
+
+  if (!window.EventSource) {
+    startPolling();
+    return;
+  }
+
+  function openStream() {
+    const stream = new EventSource("/status_stream");
+    stream.onopen = stopPolling;
+    stream.onmessage = function(e) { showStatus(JSON.parse(e.data)); };
+    stream.onerror = function() {
+      startPolling();
+      if (stream.readyState === EventSource.CLOSED) {
+        // browser won't retry this one (e.g. an error response): try later
+        setTimeout(openStream, STREAM_RETRY_MS);
+      }
+    };
+  }
+
+  openStream();
+});
@@ -0,0 +1,53 @@
+# status_events.py
+# Typed status events: what main.py reports to the website
+#
+# How it works:
+# - main.py passes an event code (plus a small payload such as counts or
+#   distances) along with each human-readable log line:
+#       log_and_print("Motors FORWARD (opening doors)...", StatusEvent.DOORS_OPENING)
+# - The website looks the code up in USER_MESSAGES (one dict lookup) instead
+#   of testing the log text against a list of prefixes, so rewording a log
+#   line can't silently break the status screen.
+
+import enum
+
+
+class StatusEvent(enum.IntEnum):
+    SYSTEM_READY = 1
+    BUTTON_PRESSED = 2
+    SENSOR_READING = 3          # payload: d1, d2 (cm or None)
+    OBJECT_DETECTED = 4
+    NO_OBJECT = 5
+    PIR_CHECK_STARTED = 6
+    NO_MOTION = 7
+    MOTION_DETECTED = 8
+    DOORS_STAY_CLOSED = 9
+    LOCK_RELEASED = 10
+    DOORS_OPENING = 11
+    BELT_STARTED = 12
+    DOORS_CLOSING = 13
+    BELT_STOPPED = 14
+    LOCK_ENGAGED = 15
+    DONATION_COUNTED = 16       # payload: total
+    DONATION_TOTAL = 17         # payload: total (no status change)
+
+
+# Event -> short user-facing message. Events not listed here (or mapped to
+# None) leave the website's current message alone.
+# IMPORTANT: if multiple events happen quickly, the LAST mapped one wins.
+USER_MESSAGES = {
+    StatusEvent.SYSTEM_READY: "Welcome to Goodwill",
+    StatusEvent.BUTTON_PRESSED: "System starts!",
+    StatusEvent.OBJECT_DETECTED: "Donation detected",
+    StatusEvent.NO_OBJECT: "No donation detected",
+    StatusEvent.PIR_CHECK_STARTED: "Detecting motion",
+    StatusEvent.NO_MOTION: "No motion detected",
+    StatusEvent.MOTION_DETECTED: "Motion detected",
+    StatusEvent.DOORS_STAY_CLOSED: "System stays locked",
+    StatusEvent.DOORS_OPENING: "Doors opening",
+    StatusEvent.BELT_STARTED: "Conveyor belt moving",
+    StatusEvent.DOORS_CLOSING: "Doors closing",
+    StatusEvent.BELT_STOPPED: "Conveyor belt stopped",
+    StatusEvent.LOCK_ENGAGED: "System locked",
+    StatusEvent.DONATION_COUNTED: "Thank you for your donation!",
+}
@@ -0,0 +1,102 @@
+# statusfeed.py
+# The website status as an immutable snapshot, plus change push for /status_stream
+#
+# How it works:
+# - Everything the page shows (message, header, donation total, when the
+#   thank-you message expires) lives in ONE StatusSnapshot object. It is
+#   never modified: the writer (log pipeline thread) builds a new snapshot
+#   and swaps the `snapshot` reference in one assignment.
+# - Readers (Flask worker threads) just read STATUS_FEED.snapshot: no lock,
+#   and they always see a consistent message / header / total triple.
+# - Each snapshot carries a version number, its JSON body and an ETag, all
+#   computed once when it is built. A thank-you snapshot also carries the
+#   snapshot to show after its deadline, so expiry is one comparison.
+# - update() bumps the version and wakes every /status_stream client waiting
+#   in wait(seen, timeout); waiting clients cost nothing until then.
+# - connect(limit) refuses clients beyond `limit` (every open stream holds a
+#   web worker thread); close() wakes all streams so they can end on shutdown.
+
+import json
+import threading
+
+
+class StatusSnapshot:
+    """One immutable version of the website status. Build a new one, don't modify."""
+
+    __slots__ = ("version", "user_message", "header_text", "donation_total",
+                 "expires_at", "after", "etag", "body")
+
+    def __init__(self, version, user_message, header_text, donation_total,
+                 etag, expires_at=None, after=None):
+        self.version = version
+        self.user_message = user_message
+        self.header_text = header_text
+        self.donation_total = donation_total
+        self.expires_at = expires_at     # monotonic deadline, then show `after`
+        self.after = after
+        self.etag = etag
+        self.body = json.dumps(
+            {
+                "user_message": user_message,
+                "header_text": header_text,
+                "donation_total": donation_total,
+            }
+        ).encode()
+
+    def current(self, now):
+        """The snapshot to show at monotonic time `now`."""
+        if self.expires_at is not None and now >= self.expires_at:
+            return self.after
+        return self
+
+
+class StatusFeed:
+    """Holds the current StatusSnapshot; wakes stream clients when it changes."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.clients = 0                 # streams currently connected
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def update(self, build):
+        """
+        Swap in build(current_snapshot) (writers are serialized).
+        `build` returns None if nothing changed. True if a new snapshot went live.
+        """
+        with self._cond:
+            snapshot = build(self.snapshot)
+            if snapshot is None:
+                return False
+            self.snapshot = snapshot
+            self._cond.notify_all()
+            return True
+
+    def wait(self, seen, timeout=None):
+        """Block until version > seen (or timeout); returns the current version."""
+        with self._cond:
+            if self.snapshot.version == seen:
+                self._cond.wait(timeout)
+            return self.snapshot.version
+
+    def close(self):
+        """Server is shutting down: wake every stream so it can finish."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def connect(self, limit=None):
+        """Register a stream; False if `limit` streams are already open."""
+        with self._cond:
+            if limit is not None and self.clients >= limit:
+                return False
+            self.clients += 1
+            return True
+
+    def disconnected(self):
+        with self._cond:
+            self.clients -= 1
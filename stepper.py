@@ -0,0 +1,213 @@
+# stepper.py
+# Stepper motion engine on its own timing thread
+#
+# How it works:
+# - StepperEngine owns a background thread. move() hands it a list of
+#   MotorMove plans and immediately returns a StepperMove handle.
+# - Each motor gets its own step count and phase delay. Every phase is
+#   scheduled at an absolute monotonic deadline (start + k * delay), so
+#   sleep() overshoot on one phase is NOT carried into the next one.
+# - The thread records how late each phase actually fired; the handle's
+#   stats give count / mean / max / stdev of that lateness (timing jitter).
+# - Callers can keep working and call handle.wait() when they need the doors
+#   to be done moving.
+# - Moves are compiled once into a MotionProgram: a table of frames
+#   (time offset, pin tuple, value tuple). Phases of all motors that fall on
+#   the same deadline share a frame, and each frame is ONE batched
+#   GPIO.output(pins, values) call. Programs are cached per move, so the hot
+#   loop only sleeps and writes. Works for any number of motors.
+# - On the simulated (virtual) clock there is no timing thread: frames are
+#   scheduled with clock.call_at() so simulated cycles stay deterministic.
+
+import collections
+import math
+import queue
+import threading
+
+# full-step sequence (same as main.py's original table)
+FULL_STEP = [
+    [1, 0, 1, 0],
+    [0, 1, 1, 0],
+    [0, 1, 0, 1],
+    [1, 0, 0, 1],
+]
+
+MotorMove = collections.namedtuple("MotorMove", "pins steps delay")
+MotorMove.__doc__ = "One motor's part of a move: pins in drive order, full steps, seconds per phase."
+
+JitterStats = collections.namedtuple("JitterStats", "frames mean_late max_late stdev duration")
+
+MotionProgram = collections.namedtuple("MotionProgram", "frames duration")
+MotionProgram.__doc__ = "Compiled move: frames = [(offset, pins, values), ...] sorted by offset."
+
+
+class StepperMove:
+    """Handle for a move running on the engine thread."""
+
+    def __init__(self, clock, plans, program):
+        self.clock = clock
+        self.plans = plans
+        self.program = program
+        self.stats = None
+        self.error = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def add_done_callback(self, fn):
+        """Call fn(move) when the move finishes (right away if it already has)."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def wait(self, timeout=None):
+        """Block until the move finished; returns its JitterStats (None on timeout)."""
+        if not self.clock.wait(self._done, timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    join = wait
+
+    def _finish(self, stats=None, error=None):
+        with self._lock:
+            self.stats = stats
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class StepperEngine:
+    """Runs StepperMoves one after another on a dedicated timing thread."""
+
+    def __init__(self, gpio, clock, sequence=FULL_STEP):
+        self.gpio = gpio
+        self.clock = clock
+        self.sequence = sequence
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._programs = {}          # plan key -> MotionProgram
+        self._virtual_busy_until = 0.0
+
+    def compile(self, plans):
+        """Build (or fetch the cached) MotionProgram for a list of MotorMove."""
+        key = tuple((tuple(p.pins), p.steps, p.delay) for p in plans)
+        program = self._programs.get(key)
+        if program is None:
+            program = compile_program(plans, self.sequence)
+            self._programs[key] = program
+        return program
+
+    def move(self, plans):
+        """Queue a move (list of MotorMove) and return its StepperMove handle."""
+        plans = list(plans)
+        handle = StepperMove(self.clock, plans, self.compile(plans))
+        if self.clock.virtual:
+            self._schedule_virtual(handle)
+            return handle
+        self._ensure_thread()
+        self._queue.put(handle)
+        return handle
+
+    def _schedule_virtual(self, handle):
+        """Sim only: queue every frame as a clock callback (moves run back to back)."""
+        start = max(self.clock.monotonic(), self._virtual_busy_until)
+        frames = handle.program.frames
+        for offset, pins, values in frames:
+            self.clock.call_at(start + offset, lambda p=pins, v=values: self.gpio.output(p, v))
+        duration = frames[-1][0] if frames else 0.0
+        self._virtual_busy_until = start + duration
+        stats = JitterStats(len(frames), 0.0, 0.0, 0.0, duration)
+        self.clock.call_at(start + duration, lambda: handle._finish(stats=stats))
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stepper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            handle = self._queue.get()
+            if handle is None:
+                return
+            try:
+                handle._finish(stats=self._execute(handle.program))
+            except Exception as exc:
+                self._release(handle.plans)
+                handle._finish(error=exc)
+
+    def _execute(self, program):
+        """Emit every frame at its deadline; return lateness statistics."""
+        clock = self.clock
+        output = self.gpio.output
+        lateness = []
+        start = clock.monotonic()
+
+        for offset, pins, values in program.frames:
+            deadline = start + offset
+            wait = deadline - clock.monotonic()
+            if wait > 0:
+                clock.sleep(wait)
+            lateness.append(clock.monotonic() - deadline)
+            output(pins, values)
+
+        return _jitter_stats(lateness, clock.monotonic() - start)
+
+    def _release(self, plans):
+        pins = [pin for plan in plans for pin in plan.pins]
+        self.gpio.output(pins, (0,) * len(pins))
+
+
+def compile_program(plans, sequence):
+    """
+    Turn MotorMove plans into frames. Motor m's phase k lands at k * delay;
+    one extra frame per motor at the end releases its coils (all 0).
+    """
+    phases_per_step = len(sequence)
+    by_offset = {}                   # offset -> ([pins], [values])
+    for plan in plans:
+        total = plan.steps * phases_per_step
+        for k in range(total + 1):
+            values = (0,) * len(plan.pins) if k == total else sequence[k % phases_per_step]
+            pins, vals = by_offset.setdefault(round(k * plan.delay, 9), ([], []))
+            pins.extend(plan.pins)
+            vals.extend(values)
+
+    frames = [(offset, tuple(pins), tuple(vals)) for offset, (pins, vals) in sorted(by_offset.items())]
+    return MotionProgram(frames, frames[-1][0] if frames else 0.0)
+
+
+def _jitter_stats(lateness, duration):
+    n = len(lateness)
+    if n == 0:
+        return JitterStats(0, 0.0, 0.0, 0.0, duration)
+    mean = sum(lateness) / n
+    var = sum((x - mean) ** 2 for x in lateness) / n
+    return JitterStats(n, mean, max(lateness), math.sqrt(var), duration)
+
+
+def format_stats(stats):
+    """Short log text for a move's timing."""
+    return (
+        f"{stats.duration:.2f} s, {stats.frames} frames, late avg "
+        f"{stats.mean_late * 1000:.2f} ms / max {stats.max_late * 1000:.2f} ms "
+        f"(stdev {stats.stdev * 1000:.2f} ms)"
+    )
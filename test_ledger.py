@@ -0,0 +1,70 @@
+# test_ledger.py
+# Ledger writer retries after a failed commit (python3 -m pytest)
+
+import sqlite3
+import time
+
+import pytest
+
+import ledger
+from ledger import DonationLedger, OUTCOME_DONATED, OUTCOME_NO_OBJECT
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def locked_ledger(tmp_path, monkeypatch):
+    """A ledger whose database is write-locked by another connection."""
+    monkeypatch.setattr(ledger, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "donations.db")
+    logs = []
+    led = DonationLedger(path, batch_interval=0.01, retry_delay=0.05, log=logs.append)
+    blocker = sqlite3.connect(path, isolation_level=None, timeout=0)
+    blocker.execute("BEGIN IMMEDIATE")
+    yield path, led, blocker, logs
+    if blocker.in_transaction:
+        blocker.execute("ROLLBACK")
+    blocker.close()
+    led.close()
+
+
+def totals(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT outcome, count FROM totals")), \
+            conn.execute("SELECT COUNT(*) FROM cycles").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_failed_commit_is_retried_and_totals_catch_up(locked_ledger):
+    path, led, blocker, logs = locked_ledger
+    led.record(OUTCOME_DONATED, 1.0, 2.0, 12.0, 12.0)
+    led.record(OUTCOME_NO_OBJECT, 3.0, 4.0, None, None)
+    wait_for(lambda: led.errors >= 1)
+    assert led.unsaved == 2
+    assert led.count(OUTCOME_DONATED) == 1      # counted right away anyway
+
+    led.record(OUTCOME_DONATED, 5.0, 6.0, 11.0, 11.0)
+    blocker.execute("COMMIT")
+    wait_for(lambda: led.unsaved == 0 and led.batches >= 1)
+    led.close()
+
+    assert totals(path) == ({OUTCOME_DONATED: 2, OUTCOME_NO_OBJECT: 1}, 3)
+    assert any("Ledger write failed" in line for line in logs)
+    assert any("Ledger write recovered" in line for line in logs)
+
+
+def test_close_during_outage_logs_unsaved_rows(locked_ledger):
+    path, led, blocker, logs = locked_ledger
+    led.record(OUTCOME_DONATED, 1.0, 2.0, 12.0, 12.0)
+    wait_for(lambda: led.errors >= 1)
+
+    led.close()
+    assert "Ledger: 1 cycles could not be saved before exit." in logs
@@ -0,0 +1,54 @@
+# test_pir_safety.py
+# PIR safety check on the simulated backend (python3 -m pytest)
+
+import pytest
+
+from simulate import setup_sim
+
+
+@pytest.fixture(scope="module")
+def sim():
+    hw, main = setup_sim(12.0)
+    yield hw, main
+    main.flush_logs()
+
+
+def settle(hw, main):
+    """PIR LOW and a full quiet window of history behind us."""
+    hw.GPIO.set_input(main.PIR_PIN, hw.GPIO.LOW)
+    hw.clock.advance(2 * main.PIR_OBSERVE_TIME)
+
+
+def test_high_run_still_going_reaches_threshold(sim):
+    hw, main = sim
+    settle(hw, main)
+    hw.GPIO.set_input(main.PIR_PIN, hw.GPIO.HIGH)
+    hw.clock.advance(main.PIR_MIN_MOTION_TIME - 1.0)
+
+    start = hw.clock.monotonic()
+    assert main.pir_clear_for_window() is False
+    # waited for the run to reach the threshold, not a whole window
+    assert hw.clock.monotonic() - start == pytest.approx(1.0, abs=0.01)
+
+
+def test_high_run_still_going_ends_before_threshold(sim):
+    hw, main = sim
+    settle(hw, main)
+    hw.GPIO.set_input(main.PIR_PIN, hw.GPIO.HIGH)
+    hw.clock.advance(main.PIR_MIN_MOTION_TIME - 1.0)
+    hw.GPIO.schedule_input(main.PIR_PIN, hw.GPIO.LOW, hw.clock.monotonic() + 0.5)
+
+    assert main.pir_clear_for_window() is True
+
+
+def test_short_spike_in_history_is_ignored(sim):
+    hw, main = sim
+    settle(hw, main)
+    hw.GPIO.set_input(main.PIR_PIN, hw.GPIO.HIGH)
+    hw.clock.advance(1.0)
+    hw.GPIO.set_input(main.PIR_PIN, hw.GPIO.LOW)
+    hw.clock.advance(1.0)
+
+    start = hw.clock.monotonic()
+    assert main.pir_clear_for_window() is True
+    assert hw.clock.monotonic() - start < 0.1
@@ -0,0 +1,44 @@
+# test_webserver.py
+# Status website responses through Flask's test client (python3 -m pytest)
+
+import contextlib
+import io
+
+import pytest
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import webserver2
+
+
+@pytest.fixture
+def client():
+    return webserver2.app.test_client()
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    'W/{etag}',
+    '"x", {etag}',
+    "*",
+])
+def test_if_none_match_returns_304(client, header):
+    etag = client.get("/status_json").headers["ETag"]
+    response = client.get("/status_json", headers={"If-None-Match": header.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+
+def test_if_none_match_prefix_is_not_a_match(client):
+    etag = client.get("/status_json").headers["ETag"]
+    for other in (etag[:-2] + '"', etag[:-1] + '0"'):
+        assert client.get("/status_json", headers={"If-None-Match": other}).status_code == 200
+
+
+def test_logs_negative_cursor_counts_as_zero(client):
+    webserver2.log_and_print("test line for /logs")
+    webserver2.flush_logs()
+    from_zero = client.get("/logs?since=0").get_json()
+    negative = client.get("/logs?since=-5").get_json()
+    assert negative["missed"] == from_zero["missed"] == 0
+    assert negative["entries"] == from_zero["entries"]
+    assert negative["last_seq"] == from_zero["last_seq"]
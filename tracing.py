@@ -0,0 +1,154 @@
+# tracing.py
+# Span tracing for individual cycles, exported as Chrome trace-event JSON
+#
+# How it works:
+# - Functions on the control path are wrapped with @traced("name") (or a
+#   block with `with TRACER.span("name"):`). While tracing is OFF (default)
+#   that costs one flag check per call.
+# - While ON, every call writes (start, end, thread, name) into preallocated
+#   arrays used as a ring: no allocation per span, the oldest spans are
+#   overwritten once `capacity` is reached.
+# - Switch it at runtime with TRACER.enable() / disable() (the website has
+#   /trace/enable and /trace/disable); DONATION_TRACE=1 turns it on at start.
+# - chrome_trace() returns the recorded spans in Chrome's trace-event format:
+#   save /trace as a .json file and open it in https://ui.perfetto.dev or
+#   chrome://tracing to see exactly which call stretched a slow cycle.
+
+import array
+import functools
+import itertools
+import os
+import threading
+import time
+
+CAPACITY = 65536        # spans kept (ring buffer)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.tracer.timer()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, self.tracer.timer())
+        return False
+
+
+class Tracer:
+    """Fixed-size ring of spans; off until enable()."""
+
+    def __init__(self, capacity=CAPACITY, timer=time.perf_counter):
+        self.capacity = capacity
+        self.timer = timer               # e.g. the hardware clock's perf_counter
+        self.enabled = False
+        self._starts = array.array("d", bytes(8 * capacity))
+        self._ends = array.array("d", bytes(8 * capacity))
+        self._threads = array.array("Q", bytes(8 * capacity))
+        self._names = [None] * capacity
+        self._thread_names = {}          # thread ident -> name
+        self._counter = itertools.count()    # next() is atomic under the GIL
+        self._written = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self._counter = itertools.count()
+        self._written = 0
+
+    def span(self, name):
+        """Context manager timing the block as one span (no-op while disabled)."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Store one finished span (times from self.timer)."""
+        n = next(self._counter)
+        i = n % self.capacity
+        ident = threading.get_ident()
+        if ident not in self._thread_names:
+            self._thread_names[ident] = threading.current_thread().name
+        self._starts[i] = start
+        self._ends[i] = end
+        self._threads[i] = ident
+        self._names[i] = name
+        self._written = n + 1
+
+    def spans(self):
+        """Recorded spans, oldest first: (name, start, end, thread ident)."""
+        written = self._written
+        count = min(written, self.capacity)
+        first = written - count
+        out = []
+        for n in range(first, written):
+            i = n % self.capacity
+            out.append((self._names[i], self._starts[i], self._ends[i], self._threads[i]))
+        return out
+
+    def chrome_trace(self):
+        """Spans as a Chrome trace-event dict (timestamps in microseconds)."""
+        spans = self.spans()
+        base = min((s[1] for s in spans), default=0.0)
+        tids = {}
+        events = []
+        for name, start, end, ident in spans:
+            tid = tids.setdefault(ident, len(tids) + 1)
+            events.append({
+                "name": name,
+                "ph": "X",
+                "ts": round((start - base) * 1e6, 3),
+                "dur": round((end - start) * 1e6, 3),
+                "pid": 1,
+                "tid": tid,
+            })
+        for ident, tid in tids.items():
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": self._thread_names.get(ident, str(ident))},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+TRACER = Tracer()
+if os.environ.get("DONATION_TRACE") == "1":
+    TRACER.enable()
+
+
+def traced(name, tracer=TRACER):
+    """Decorator: record every call of the function as a span named `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            start = tracer.timer()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                tracer.record(name, start, tracer.timer())
+        return wrapper
+    return wrap
@@ -3,182 +3,216 @@
 
 #
 # How it works:
-# - Main program calls log_and_print("some message")
-# - This file maps that raw message to a short user-facing message
+# - Main program calls log_and_print("some message", StatusEvent.SOMETHING)
+# - log_and_print only timestamps the message and queues it (logpipe.py);
+#   a background thread prints it, buffers it and does the status mapping,
+#   so logging costs the hardware control thread almost nothing
+# - main.py tags the steps the donor should see with a StatusEvent
+#   (status_events.py); this file maps the event to a short user-facing message
 # - Flask serves a nice UI at http://<pi-ip>:5000
-# - The page does NOT auto-reload (no flashing). It polls /status_json and updates text smoothly.
+# - The page does NOT auto-reload (no flashing). Status changes are pushed to it
+#   over /status_stream (Server-Sent Events); it falls back to polling
+#   /status_json every second only while the stream is down.
+# - The page's CSS / JS live in static/ and are served from /assets/ with a
+#   content hash in the name, precompressed and cached forever (assets.py).
 
-from flask import Flask, render_template_string, jsonify
-import threading
+from flask import Flask, jsonify, request, Response
 import datetime
-import re
+import json
+import os
+import time
+
+from assets import AssetPipeline, CACHE_FOREVER
+from logpipe import LogPipeline
+from logstore import LogStore
+from metrics import REGISTRY
+from tracing import TRACER, traced
+from statusfeed import StatusFeed, StatusSnapshot
+from wsgiserver import WebServer, WORKERS
+from status_events import StatusEvent, USER_MESSAGES
 
 app = Flask(__name__)
 
-# --- Optional debug log buffer (not shown on website) ---
-LOG_BUFFER = []
+# --- Debug log buffer (not shown on the status page; read it via /logs) ---
 MAX_LOGS = 300
+LOG_STORE = LogStore(MAX_LOGS)
+LOGS_PAGE_LIMIT = 500    # most entries one /logs response returns
 
 # --- User-facing state (what the website displays) ---
-CURRENT_USER_MSG = "Welcome to Goodwill"
-DONATION_TOTAL = 0
+# Lives in STATUS_FEED.snapshot (statusfeed.py), replaced as a whole on change.
+WELCOME_MSG = "Welcome to Goodwill"
+THANK_YOU_MSG = USER_MESSAGES[StatusEvent.DONATION_COUNTED]
 
 # Show "Thank you" for a short time after donation counted
-LAST_DONATION_TS = None
 THANK_YOU_DISPLAY_SECONDS = 5
 
-
-def _add_log(message: str):
-    """Store raw logs with timestamps (optional)."""
-    ts = datetime.datetime.now().strftime("%H:%M:%S")
-    LOG_BUFFER.append((ts, message))
-    if len(LOG_BUFFER) > MAX_LOGS:
-        del LOG_BUFFER[:len(LOG_BUFFER) - MAX_LOGS]
-
-
-def _map_to_user_message(msg: str):
+# Header is just a nicer "title" above the big status (default: WELCOME_MSG)
+HEADER_TEXTS = {
+    THANK_YOU_MSG: "Thank you!",
+    "Donation detected": "Processing your donation",
+    "Detecting motion": "Processing your donation",
+    "No motion detected": "Processing your donation",
+    "Doors opening": "Processing your donation",
+    "Conveyor belt moving": "Processing your donation",
+    "Doors closing": "Processing your donation",
+    "System locked": "Processing your donation",
+}
+
+# BOOT_ID keeps ETags from an earlier run from matching after a restart
+BOOT_ID = format(int(time.time()), "x")
+
+# --- Web server (one instance, pooled worker threads) ---
+WEB_WORKERS = int(os.environ.get("DONATION_WEB_WORKERS", WORKERS))
+WEB_SERVER = None
+
+# --- Push channel for /status_stream (Server-Sent Events) ---
+# Comment line so proxies / browsers keep the stream open. A closed page is
+# only noticed on the next write, so this is also how long its slot stays taken.
+STREAM_KEEPALIVE_SECONDS = 5
+# Each open stream holds a worker thread; STREAM_SPARE_WORKERS stay free for
+# pages / polls. Displays turned away get the current status plus a "retry:"
+# line and an ended stream, so the browser reconnects by itself later (a
+# non-200 answer would make it give up for good); until then they poll.
+STREAM_SPARE_WORKERS = 2
+STREAM_BUSY_RETRY_MS = 10000
+
+# --- Static assets (CSS / JS / mascot): fingerprinted + precompressed once ---
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSETS = AssetPipeline(STATIC_DIR)
+for _name in ("style.css", "status.js", "goodwill_mascot.png"):
+    ASSETS.add(_name)
+
+# --- Rendered page, rebuilt only when the status changes ---
+_PAGE_CACHE = None       # (etag, html bytes)
+
+
+def _add_log(message: str, timestamp: float = None):
+    """Store raw logs with timestamps (ring buffer, oldest dropped)."""
+    when = datetime.datetime.now() if timestamp is None else datetime.datetime.fromtimestamp(timestamp)
+    ts = when.strftime("%H:%M:%S")
+    LOG_STORE.append(ts, message)
+
+
+def _make_snapshot(version, user_message, donation_total, expires_at=None):
+    """Build a StatusSnapshot; a thank-you one also gets its Welcome follow-up."""
+    after = None
+    if expires_at is not None:
+        after = StatusSnapshot(version, WELCOME_MSG, WELCOME_MSG, donation_total,
+                               f'"{BOOT_ID}-{version}w"')
+    return StatusSnapshot(version, user_message, HEADER_TEXTS.get(user_message, WELCOME_MSG),
+                          donation_total, f'"{BOOT_ID}-{version}"', expires_at, after)
+
+
+STATUS_FEED = StatusFeed(_make_snapshot(0, WELCOME_MSG, 0))
+
+
+def _update_status(user_message=None, donation_total=None, thank_you=False):
+    """Publish a new snapshot if the message / total changed (or a new thank-you)."""
+    def build(old):
+        now = time.monotonic()
+        shown = old.current(now)         # an expired thank-you is Welcome already
+        message = shown.user_message if user_message is None else user_message
+        total = shown.donation_total if donation_total is None else donation_total
+        if not thank_you and message == shown.user_message and total == shown.donation_total:
+            return None
+        if thank_you:
+            expires_at = now + THANK_YOU_DISPLAY_SECONDS
+        else:                            # a running thank-you keeps its deadline
+            expires_at = shown.expires_at if message == shown.user_message else None
+        return _make_snapshot(old.version + 1, message, total, expires_at)
+
+    STATUS_FEED.update(build)
+
+
+def _map_to_user_message(event):
     """
-    Map raw program prints -> short user-facing messages.
+    Map a status event (status_events.StatusEvent) -> short user-facing message.
 
-    IMPORTANT:
-    If multiple log messages happen quickly, the LAST mapped message wins.
-    So only map messages that represent "the step" you want to show.
+    One dict lookup; events without a user message (sensor readings,
+    "Total donations so far", untagged log lines) return None.
+    IMPORTANT: if multiple events happen quickly, the LAST mapped one wins.
     """
+    return USER_MESSAGES.get(event)
 
-    # Donation / object detection
-    if msg.startswith("Object detected by distance sensors."):
-        return "Donation detected"
-
-    # PIR window
-    # Your main code now prints:
-    # "Checking for sustained motion for up to ..."
-    if msg.startswith("Checking for sustained motion"):
-        return "Detecting motion"
-
-    if msg.startswith("No sustained motion detected. Safely opening doors."):
-        return "No motion detected"
-
-    # PIR detected (your new print starts with "Person detected (PIR HIGH for")
-    if msg.startswith("Person detected (PIR HIGH"):
-        return "Motion detected"
-
-    # Door + conveyor steps
-    if msg.startswith("Motors FORWARD (opening doors)"):
-        return "Doors opening"
 
-    if msg.startswith("Doors open. Starting conveyor belt"):
-        return "Conveyor belt moving"
-
-    if msg.startswith("Motors BACKWARD (closing doors)"):
-        return "Doors closing"
-
-    if msg.startswith("Conveyor belt stopped."):
-        return "Conveyor belt stopped"
+def log_message(message: str, timestamp: float = None, event=None, payload=None):
+    """
+    Record raw log + update the website status (message / donation total).
+    """
+    _add_log(message, timestamp)
+    if event is None:
+        return
 
-    if msg.startswith("Lock engaged (door locked)."):
-        return "System locked"
+    # Donation counted: update total + show thank-you message
+    if event == StatusEvent.DONATION_COUNTED:
+        _update_status(THANK_YOU_MSG, payload["total"], thank_you=True)
+        return
 
-    # Button press
-    if msg.startswith("Button pressed! Measuring distance once"):
-        return "System starts!"
+    if event == StatusEvent.DONATION_TOTAL:
+        _update_status(donation_total=payload["total"])
+        return
 
-    # Hide raw sensor lines from UI
-    if msg.startswith("Sensor 1:"):
-        return None
+    # Otherwise map to a short user-facing message
+    user_msg = _map_to_user_message(event)
+    if user_msg is not None:
+        _update_status(user_msg)
 
-    # If motion was detected and the system stays locked
-    if msg.startswith("Doors remain closed for safety."):
-        return "System stays locked"
 
-    # "No object detected" case
-    if msg.startswith("No object detected. Motors, conveyor, and lock state unchanged."):
-        return "No donation detected"
+def set_donation_total(total: int):
+    """Restore the website's donation total (e.g. from the ledger at startup)."""
+    _update_status(donation_total=total)
 
-    # Startup line
-    if msg.startswith("System ready. Waiting for button press"):
-        return "Welcome to Goodwill"
 
-    # IMPORTANT: do NOT map "Total donations so far" to status,
-    # because it will overwrite other messages instantly.
-    if msg.startswith("Total donations so far:"):
-        return None
+def _consume_log(record):
+    """Log pipeline consumer thread: terminal + log buffer + website status."""
+    timestamp, message, event, payload = record
+    print(message)
+    log_message(message, timestamp, event, payload)
 
-    # Donation counted is handled separately in log_message()
-    if msg.startswith("Donation counted! Total donations:"):
-        return None
 
-    return None
+LOG_PIPELINE = LogPipeline(_consume_log)
 
 
-def log_message(message: str):
-    """
-    Record raw log + update CURRENT_USER_MSG / DONATION_TOTAL for website.
+@traced("log_and_print")
+def log_and_print(message: str, event=None, **payload):
     """
-    global CURRENT_USER_MSG, DONATION_TOTAL, LAST_DONATION_TS
+    Use this instead of print() in your main code.
+    It prints to terminal AND updates the website - both happen on the log
+    pipeline's thread; here we only queue (timestamp, message, event, payload).
 
-    _add_log(message)
+    `event` (a StatusEvent) decides what the website shows; `message` is only
+    the human-readable log text, so it can be reworded freely.
+    """
+    LOG_PIPELINE.submit((time.time(), message, event, payload))
 
-    # Donation counted: update total + show thank-you message
-    if message.startswith("Donation counted! Total donations:"):
-        m = re.search(r"Total donations:\s*(\d+)", message)
-        if m:
-            try:
-                DONATION_TOTAL = int(m.group(1))
-            except ValueError:
-                pass
-
-        LAST_DONATION_TS = datetime.datetime.now()
-        CURRENT_USER_MSG = "Thank you for your donation!"
-        return
 
-    # Otherwise map to a short user-facing message
-    user_msg = _map_to_user_message(message)
-    if user_msg is not None:
-        CURRENT_USER_MSG = user_msg
+def flush_logs(timeout: float = 2.0):
+    """Wait until every queued log line has been printed / mapped."""
+    return LOG_PIPELINE.flush(timeout)
 
 
-def log_and_print(message: str):
+def current_status():
     """
-    Use this instead of print() in your main code.
-    It prints to terminal AND updates the website.
+    The StatusSnapshot the website should show right now (thank-you expired
+    -> Welcome). Lock-free: one attribute read + one comparison.
     """
-    print(message)
-    log_message(message)
+    return STATUS_FEED.snapshot.current(time.monotonic())
 
 
 def get_status_state():
-    """
-    Compute what the website should show right now.
-    (e.g., after thank-you timer, return to Welcome)
-    """
-    global CURRENT_USER_MSG
-
-    now = datetime.datetime.now()
-    user_message = CURRENT_USER_MSG
-    header_text = "Welcome to Goodwill"
-
-    # After donation completes, keep Thank-you for a few seconds, then revert to Welcome
-    if LAST_DONATION_TS is not None and CURRENT_USER_MSG == "Thank you for your donation!":
-        if (now - LAST_DONATION_TS).total_seconds() > THANK_YOU_DISPLAY_SECONDS:
-            user_message = "Welcome to Goodwill"
-            # NOTE: we are not changing CURRENT_USER_MSG here on purpose.
-            # It's fine if the UI shows "Welcome" while the internal last msg is Thank-you.
-
-    # Header is just a nicer “title” above the big status
-    if user_message == "Thank you for your donation!":
-        header_text = "Thank you!"
-    elif user_message in (
-        "Donation detected",
-        "Detecting motion",
-        "No motion detected",
-        "Doors opening",
-        "Conveyor belt moving",
-        "Doors closing",
-        "System locked",
-    ):
-        header_text = "Processing your donation"
-
-    return user_message, header_text
+    """(user_message, header_text) the website should show right now."""
+    snapshot = current_status()
+    return snapshot.user_message, snapshot.header_text
+
+
+def _next_status_timeout():
+    """Seconds until the status changes by itself (thank-you expiring), capped by the keep-alive."""
+    expires_at = STATUS_FEED.snapshot.expires_at
+    if expires_at is not None:
+        left = expires_at - time.monotonic()
+        if left > 0:
+            return min(left + 0.05, STREAM_KEEPALIVE_SECONDS)
+    return STREAM_KEEPALIVE_SECONDS
 
 
 # ---------- UI HTML (Goodwill-style) ----------
@@ -190,204 +224,9 @@ PAGE_TEMPLATE = """
   <title>Goodwill Donation Box</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
 
-  <style>
-    :root {
-      --goodwill-blue: #0053A0;
-      --goodwill-blue-soft: #0a66c2;
-      --cream: #fdf8f3;
-      --text-main: #112132;
-      --text-muted: #6b7280;
-      --border-soft: #e5e7eb;
-    }
-
-    * { box-sizing: border-box; }
-
-    body {
-      margin: 0;
-      font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-      background: var(--goodwill-blue-soft);
-      min-height: 100vh;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      padding: 1.5rem;
-      color: var(--text-main);
-    }
-
-    .layout {
-      width: 100%;
-      max-width: 980px;
-      display: flex;
-      gap: 1.8rem;
-      align-items: stretch;
-      justify-content: center;
-      flex-wrap: wrap;
-    }
-
-    .left-pane {
-      flex: 0 1 320px;
-      color: #ffffff;
-      display: flex;
-      flex-direction: column;
-      justify-content: space-between;
-      align-items: flex-start;
-      gap: 1.2rem;
-      min-height: 260px;
-    }
-
-    .title {
-      font-size: 2.2rem;
-      font-weight: 700;
-      line-height: 1.1;
-    }
-
-    .subtitle {
-      margin-top: 0.4rem;
-      font-size: 0.95rem;
-      opacity: 0.9;
-    }
-
-    .mascot {
-      width: 100%;
-      max-width: 260px;
-      align-self: center;
-      display: block;
-      filter: drop-shadow(0 14px 25px rgba(15,23,42,0.45));
-    }
-
-    .right-card {
-      flex: 1 1 360px;
-      background: var(--cream);
-      border-radius: 1.4rem;
-      padding: 1.5rem 1.6rem 1.3rem;
-      box-shadow:
-        0 16px 40px rgba(15,23,42,0.25),
-        0 0 0 1px rgba(15,23,42,0.09);
-      display: flex;
-      flex-direction: column;
-      gap: 1.2rem;
-    }
-
-    .card-header {
-      display: flex;
-      justify-content: space-between;
-      align-items: center;
-      gap: 0.75rem;
-      flex-wrap: wrap;
-    }
-
-    .card-title {
-      font-size: 1.5rem;
-      font-weight: 700;
-      color: var(--text-main);
-    }
-
-    .badge {
-      font-size: 0.75rem;
-      text-transform: uppercase;
-      letter-spacing: 0.14em;
-      padding: 0.2rem 0.7rem;
-      border-radius: 999px;
-      background: #e0ecff;
-      color: var(--goodwill-blue);
-      border: 1px solid rgba(0, 83, 160, 0.4);
-      white-space: nowrap;
-    }
-
-    .status-block {
-      background: #ffffff;
-      border-radius: 1rem;
-      padding: 1.1rem 1rem 1rem;
-      border: 1px solid var(--border-soft);
-      text-align: left;
-    }
-
-    .status-label {
-      font-size: 0.8rem;
-      text-transform: uppercase;
-      letter-spacing: 0.16em;
-      color: var(--text-muted);
-      margin-bottom: 0.55rem;
-    }
-
-    .status-text {
-      font-size: 1.6rem;
-      font-weight: 650;
-      line-height: 1.35;
-      color: var(--text-main);
-    }
-
-    .bottom-row {
-      display: flex;
-      justify-content: space-between;
-      align-items: center;
-      gap: 0.75rem;
-      flex-wrap: wrap;
-      font-size: 0.85rem;
-      color: var(--text-muted);
-    }
-
-    .connection {
-      display: inline-flex;
-      align-items: center;
-      gap: 0.4rem;
-    }
-
-    .dot {
-      width: 9px;
-      height: 9px;
-      border-radius: 999px;
-      background: #22c55e;
-      box-shadow: 0 0 7px rgba(34,197,94,0.9);
-    }
-
-    .donations-pill {
-      padding: 0.4rem 0.85rem;
-      border-radius: 999px;
-      background: #ffffff;
-      border: 1px solid rgba(0, 83, 160, 0.18);
-      display: inline-flex;
-      align-items: baseline;
-      gap: 0.35rem;
-    }
-
-    .donations-number {
-      font-weight: 800;
-      color: var(--goodwill-blue);
-      font-size: 1rem;
-    }
-
-    @media (max-width: 780px) {
-      .left-pane {
-        align-items: center;
-        text-align: center;
-      }
-      .title { font-size: 1.9rem; }
-    }
-  </style>
-
-  <script>
-    // No full-page reloads (no flashing).
-    // We poll /status_json and update only the text.
-    document.addEventListener("DOMContentLoaded", function() {
-      async function refreshStatus() {
-        try {
-          const res = await fetch("/status_json");
-          if (!res.ok) return;
-          const data = await res.json();
-
-          document.getElementById("status-text").textContent = data.user_message;
-          document.getElementById("header-text").textContent = data.header_text;
-          document.getElementById("donation-total").textContent = data.donation_total;
-        } catch (e) {
-          // ignore errors silently
-        }
-      }
+  <link rel="stylesheet" href="{{ asset_url('style.css') }}">
 
-      refreshStatus();
-      setInterval(refreshStatus, 1000);
-    });
-  </script>
+  <script src="{{ asset_url('status.js') }}" defer></script>
 </head>
 <body>
   <div class="layout">
@@ -398,7 +237,7 @@ PAGE_TEMPLATE = """
       </div>
 
       <!-- Put your mascot PNG at: static/goodwill_mascot.png -->
-      <img src="/static/goodwill_mascot.png"
+      <img src="{{ asset_url('goodwill_mascot.png') }}"
            alt="Cartoon donation box mascot"
            class="mascot">
     </div>
@@ -432,37 +271,164 @@ PAGE_TEMPLATE = """
 """
 
 
+# Parsed and compiled once at startup, not on every page load
+PAGE = app.jinja_env.from_string(PAGE_TEMPLATE)
+
+
+def _client_has(etag):
+    """True if the request's If-None-Match matches `etag` (a list, W/ tags and * included)."""
+    return request.if_none_match.contains_weak(etag.strip('"'))
+
+
+def _cached_response(etag, body, mimetype):
+    """200 with body, or 304 (no body) if the client already has this ETag."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _client_has(etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
 @app.route("/")
 def index():
-    user_message, header_text = get_status_state()
-    return render_template_string(
-        PAGE_TEMPLATE,
-        user_message=user_message,
-        donation_total=DONATION_TOTAL,
-        header_text=header_text,
-    )
+    global _PAGE_CACHE
+    snapshot = current_status()
+    cache = _PAGE_CACHE
+    if cache is None or cache[0] != snapshot.etag:
+        html = PAGE.render(
+            asset_url=ASSETS.url,
+            user_message=snapshot.user_message,
+            donation_total=snapshot.donation_total,
+            header_text=snapshot.header_text,
+        ).encode()
+        cache = _PAGE_CACHE = (snapshot.etag, html)
+    return _cached_response(snapshot.etag, cache[1], "text/html")
 
 
 @app.route("/status_json")
 def status_json():
-    """Small endpoint the webpage polls every second."""
-    user_message, header_text = get_status_state()
+    """Status as JSON (the page polls this only if /status_stream is down)."""
+    snapshot = current_status()
+    return _cached_response(snapshot.etag, snapshot.body, "application/json")
+
+
+@app.route("/assets/<name>")
+def asset(name):
+    """Fingerprinted static file: cached forever, gzip/brotli if the browser accepts it."""
+    item = ASSETS.lookup(name)
+    if item is None:
+        return Response("Not found\n", status=404)
+    headers = {"ETag": item.etag, "Cache-Control": CACHE_FOREVER, "Vary": "Accept-Encoding"}
+    if _client_has(item.etag):
+        return Response(status=304, headers=headers)
+    encoding = ASSETS.choose_encoding(item, request.accept_encodings.quality)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(item.encodings[encoding], mimetype=item.mimetype, headers=headers)
+
+
+@app.route("/metrics")
+def metrics():
+    """Cycle / stage timing histograms and outcome counters (Prometheus text format)."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/trace")
+def trace():
+    """Recorded spans as Chrome trace-event JSON (open in ui.perfetto.dev)."""
+    return Response(
+        json.dumps(TRACER.chrome_trace()),
+        mimetype="application/json",
+        headers={"Content-Disposition": "attachment; filename=donation_trace.json"},
+    )
+
+
+@app.route("/trace/<action>", methods=["POST"])
+def trace_control(action):
+    """POST /trace/enable, /trace/disable or /trace/clear."""
+    if action == "enable":
+        TRACER.enable()
+    elif action == "disable":
+        TRACER.disable()
+    elif action == "clear":
+        TRACER.clear()
+    else:
+        return Response("Unknown trace action\n", status=404)
+    return jsonify({"enabled": TRACER.enabled})
+
+
+@app.route("/logs")
+def logs():
+    """
+    Raw program log for operators: /logs?since=<seq>
+    Returns only lines newer than `since`; poll again with the returned
+    "last_seq" to tail the log without re-downloading it.
+    """
+    since = request.args.get("since", default=0, type=int)
+    limit = request.args.get("limit", default=LOGS_PAGE_LIMIT, type=int)
+    entries, missed = LOG_STORE.since(since, min(max(limit, 1), LOGS_PAGE_LIMIT))
+    last_seq = entries[-1][0] if entries else min(max(since, 0), LOG_STORE.last_seq)
     return jsonify(
         {
-            "user_message": user_message,
-            "header_text": header_text,
-            "donation_total": DONATION_TOTAL,
+            "entries": [{"seq": seq, "time": ts, "message": msg} for seq, ts, msg in entries],
+            "last_seq": last_seq,
+            "missed": missed,
         }
     )
 
 
-def start_web_server(host="0.0.0.0", port=5000):
+@app.route("/status_stream")
+def status_stream():
+    """
+    Server-Sent Events: one "data:" message per status change, pushed as soon
+    as log_message() updates the status. Sends the current status first.
     """
-    Start Flask in a background daemon thread so it doesn't block your main script.
-    In your main code, call: start_web_server()
+    workers = WEB_SERVER.workers if WEB_SERVER is not None else WEB_WORKERS
+    if not STATUS_FEED.connect(max(1, workers - STREAM_SPARE_WORKERS)):
+        # all stream slots taken: current status once, then "come back later"
+        body = b"retry: %d\ndata: %s\n\n" % (STREAM_BUSY_RETRY_MS, current_status().body)
+        return Response(body, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    def _stream():
+        try:
+            version = STATUS_FEED.version
+            sent = None
+            while not STATUS_FEED.closed:
+                snapshot = current_status()
+                if snapshot.etag != sent:
+                    sent = snapshot.etag
+                    yield b"data: " + snapshot.body + b"\n\n"
+                else:
+                    yield b": keep-alive\n\n"
+                version = STATUS_FEED.wait(version, _next_status_timeout())
+        finally:
+            STATUS_FEED.disconnected()
+
+    return Response(
+        _stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def start_web_server(host="0.0.0.0", port=5000, workers=None):
     """
-    def _run():
-        app.run(host=host, port=port, debug=False, use_reloader=False)
+    Start the status website in the background (pooled worker threads).
+    Safe to call more than once: later calls return the running server.
+    In your main code, call: start_web_server()  (and stop_web_server() on exit)
 
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
+    Returns the WebServer; its `ready` event is set once it accepts requests
+    (`error` holds the reason if the port could not be opened).
+    """
+    global WEB_SERVER
+    if WEB_SERVER is None:
+        WEB_SERVER = WebServer(app, host, port, workers or WEB_WORKERS)
+    STATUS_FEED.closed = False
+    WEB_SERVER.start()
+    return WEB_SERVER
+
+
+def stop_web_server(timeout: float = 2.0):
+    """Close open status streams and stop the web server (if running)."""
+    STATUS_FEED.close()
+    if WEB_SERVER is not None:
+        WEB_SERVER.stop(timeout)
@@ -0,0 +1,147 @@
+# wsgiserver.py
+# Background WSGI server with a fixed pool of worker threads
+#
+# How it works:
+# - WebServer(app, host, port, workers).start() binds the port (werkzeug's
+#   WSGI server, no Flask dev server / reloader) and runs the accept loop on
+#   one daemon thread. start() is idempotent: a second call does nothing.
+# - Each accepted connection is handed to a ThreadPoolExecutor with
+#   `workers` threads, so many viewers are served concurrently but the
+#   number of threads competing with the control loop stays bounded.
+# - `ready` is a threading.Event that is set once the port is bound and
+#   the accept loop is running; wait_ready() blocks on it.
+# - Accepted connections get a socket timeout (CONNECTION_TIMEOUT), so an
+#   idle keep-alive or half-open connection can't hold a worker forever.
+# - stop() stops accepting, closes the listening socket AND every accepted
+#   connection (a worker blocked reading an idle keep-alive connection would
+#   otherwise keep the process from exiting), then waits up to `timeout` for
+#   the workers to finish. Long-lived responses (SSE) should watch their own
+#   stop signal.
+# - Successful requests are not logged (a polling display would print a line
+#   every second); errors still are.
+
+import concurrent.futures
+import socket
+import threading
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+WORKERS = 8             # request handler threads
+CONNECTION_TIMEOUT = 30 # seconds an accepted connection may sit idle
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    timeout = CONNECTION_TIMEOUT
+
+    def log_request(self, code="-", size="-"):
+        if str(code).startswith(("4", "5")):
+            super().log_request(code, size)
+
+
+class _PooledWSGIServer(BaseWSGIServer):
+    """werkzeug WSGI server that handles requests on a thread pool."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app, handler=_QuietRequestHandler)
+        self.pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="web-worker")
+        self.connections = set()         # accepted sockets not closed yet
+        self.futures = set()             # queued / running _handle calls
+        self._conn_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._conn_lock:
+            self.connections.add(request)
+            future = self.pool.submit(self._handle, request, client_address)
+            self.futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future):
+        with self._conn_lock:
+            self.futures.discard(future)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._conn_lock:
+                self.connections.discard(request)
+            self.shutdown_request(request)
+
+    def close_connections(self):
+        """Wake every worker blocked on an accepted socket (it then ends its request)."""
+        with self._conn_lock:
+            connections = list(self.connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass                     # already closed by the client
+
+    def wait_idle(self, timeout=None):
+        """Wait until every queued / running request has finished (or timeout)."""
+        with self._conn_lock:
+            futures = list(self.futures)
+        concurrent.futures.wait(futures, timeout)
+
+
+class WebServer:
+    """Owns one pooled WSGI server; start()/stop() are safe to call repeatedly."""
+
+    def __init__(self, app, host="0.0.0.0", port=5000, workers=WORKERS):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.ready = threading.Event()
+        self.error = None                # OSError from binding, if any
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Bind and start serving in the background. Returns True if serving."""
+        with self._lock:
+            if self._thread is not None:
+                return True
+            try:
+                self._server = _PooledWSGIServer(self.host, self.port, self.app, self.workers)
+            except OSError as exc:       # e.g. port already in use
+                self.error = exc
+                return False
+            self.error = None
+            self.port = self._server.server_port     # real port if 0 was asked for
+            self._thread = threading.Thread(
+                target=self._serve, args=(self._server,), name="web-server", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def wait_ready(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def stop(self, timeout=2.0):
+        """Stop accepting, close the port and all connections; wait up to `timeout` for workers."""
+        with self._lock:
+            server, self._server = self._server, None
+            thread, self._thread = self._thread, None
+        if server is None:
+            return
+        self.ready.clear()
+        server.shutdown()                # ends serve_forever()
+        thread.join(timeout)
+        server.server_close()
+        server.close_connections()
+        server.wait_idle(timeout)
+        server.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _serve(self, server):
+        self.ready.set()
+        server.serve_forever(poll_interval=0.5)